@@ -1,29 +1,74 @@
+import logging
+import os
 import re
 import time
+import uuid
 
 import streamlit as st
 
-from src.media_processing import get_video_info, find_captions, retrieve_subtitles
-# Removed: from src.transcribe import *
-from src.llm_actions import *
-from src.utils import *
+from src.jobs import (DONE, FAILED, JOB_METRICS_DIR, JOB_POLL_SECONDS, JOB_WORKERS, REGENERATE, TRANSLATE, get_job_queue,
+                      start_workers)
+from src.llm_actions import validate_api_key
+from src.metrics import logger as metrics_logger, metrics, start_metrics_server
+from src.media_processing import get_video_info, find_captions
+from src.search_index import get_search_index, hit_url
+from src.shared_store import get_shared_store, get_shared_text
+from src.transcript_index import get_transcript_index, highlight
+from src.utils import convert_youtube_url, format_timestamp, style_css
 
 
+# Output languages offered in the settings; others can be typed in
+SUMMARY_LANGUAGES = ("English", "Dutch", "Russian", "German", "French", "Spanish", "Italian", "Portuguese",
+                     "Ukrainian", "Polish", "Turkish", "Chinese", "Japanese", "Korean", "Arabic", "Hindi")
+
+# Search results listed in the Full Transcript tab and in the search over processed videos
+TRANSCRIPT_SEARCH_RESULTS = 20
+LIBRARY_SEARCH_RESULTS = 10
+
+# While a job runs its previews are refreshed this often, and only the end of the transcript is shown
+JOB_PREVIEW_SECONDS = 1.0
+TRANSCRIPT_PREVIEW_CHARS = 3000
+
 # Set the page configuration (should be at the top)
 st.set_page_config(page_title="YouTube Summarizer", layout='centered', page_icon=":material/subtitles:")
 
 # Background image https://unsplash.com/photos/blue-and-yellow-abstract-painting-1xZ0SqLPE4E
-background_image = get_base64('src/background.jpg')  # Replace with your light theme image
-
-st.markdown(style_css(background_image), unsafe_allow_html=True)
+# served from static/background.jpg; the CSS is built once per process
+st.markdown(style_css(), unsafe_allow_html=True)
 
 st.divider() 
 
+# Expose the per-stage metrics for Prometheus when a port is configured (started once per process),
+# including those the job workers export
+metrics.collect_from(JOB_METRICS_DIR)
+# Metrics warnings are shown whenever metrics are exported; METRICS_LOG=1 also logs every stage as a JSON line
+if (os.environ.get("METRICS_PORT") or os.environ.get("METRICS_FILE") or os.environ.get("METRICS_LOG")) and not metrics_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    metrics_logger.addHandler(handler)
+    metrics_logger.setLevel(logging.INFO if os.environ.get("METRICS_LOG") else logging.WARNING)
+if os.environ.get("METRICS_PORT"):
+    start_metrics_server(int(os.environ["METRICS_PORT"]))
+
+# Videos are processed by worker processes fed from a persistent job queue (started once per process);
+# with JOB_WORKERS=0 the workers run separately: python worker.py
+if JOB_WORKERS:
+    start_workers(JOB_WORKERS)
+
 # Initialize session state variables
-if "summary" not in st.session_state:
-    st.session_state.summary = None
-if "full_transcript" not in st.session_state:
-    st.session_state.full_transcript = None
+# Sessions hold keys into the process-wide shared store, not the texts themselves
+if "summary_key" not in st.session_state:
+    st.session_state.summary_key = None
+if "transcript_key" not in st.session_state:
+    st.session_state.transcript_key = None
+if "subtitles_key" not in st.session_state:
+    st.session_state.subtitles_key = None
+if "caption_language" not in st.session_state:
+    st.session_state.caption_language = None  # Caption track the outputs were made from
+if "caption_code" not in st.session_state:
+    st.session_state.caption_code = None
+if "summary_language" not in st.session_state:
+    st.session_state.summary_language = None  # Output language of the current summary ("" for the original)
 if "video_title" not in st.session_state:
     st.session_state.video_title = None
 if "previous_url" not in st.session_state:
@@ -43,9 +88,96 @@ if "youtube_key" not in st.session_state:
 if "condition_yt" not in st.session_state:
     st.session_state.condition_yt = False
 
+if "chapter_summaries" not in st.session_state:
+    st.session_state.chapter_summaries = None
+if "translation_keys" not in st.session_state:
+    st.session_state.translation_keys = None  # Output language -> shared store key of the translated summary
+if "video_start" not in st.session_state:
+    st.session_state.video_start = 0  # Position of the embedded player in seconds
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None  # Job processing the current video, also kept in the URL to survive reloads
+
 def clear_outputs():
-    st.session_state.summary = None
-    st.session_state.full_transcript = None
+    st.session_state.summary_key = None
+    st.session_state.transcript_key = None
+    st.session_state.subtitles_key = None
+    st.session_state.caption_language = None
+    st.session_state.caption_code = None
+    st.session_state.summary_language = None
+    st.session_state.chapter_summaries = None
+    st.session_state.translation_keys = None
+    st.session_state.video_start = 0
+    st.session_state.job_id = None
+    st.query_params.pop("job", None)
+
+def apply_job_result(job):
+    result = job["result"]
+    st.session_state.subtitles_key = result["subtitles_key"]
+    st.session_state.summary_key = result["summary_key"]
+    st.session_state.transcript_key = result["transcript_key"]
+    st.session_state.caption_language = result["caption_language"]
+    st.session_state.caption_code = result["caption_code"]
+    st.session_state.summary_language = result["summary_language"]
+    st.session_state.translation_keys = result["translation_keys"]
+    st.session_state.chapter_summaries = result["chapter_summaries"]
+    st.session_state.video_title = result["title"]
+    st.session_state.previous_url = job["params"]["url"]
+    # The output language can still be changed: the summary is then translated
+    st.session_state.language_settings_disabled = False
+
+def transcript_tail(text):
+    # The end of a growing transcript, from a line start, so the preview payload stays bounded
+    if len(text) <= TRANSCRIPT_PREVIEW_CHARS:
+        return text
+    tail = text[-TRANSCRIPT_PREVIEW_CHARS:]
+    return tail[tail.find("\n") + 1:]
+
+def follow_job(job_id):
+    # Streams the summary and the end of the transcript of a running job into their tabs until the job ends
+    queue = get_job_queue()
+    status = st.empty()
+    stream_tabs = dict(zip(("summary", "full_transcript"), st.tabs(["Summary", "Full Transcript"])))
+    previews = {name: tab.empty() for name, tab in stream_tabs.items()}
+    attempts = None
+    while True:
+        job = queue.get(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+        if job["attempts"] != attempts:
+            # Another attempt writes the outputs again from the start
+            attempts = job["attempts"]
+            texts = {"summary": "", "full_transcript": ""}
+            position = 0
+            for preview in previews.values():
+                preview.empty()
+        position, pieces = queue.read_output(job_id, position)
+        for name, piece in pieces:
+            texts[name] += piece
+        updated = {name for name, _ in pieces}
+        if "summary" in updated:
+            previews["summary"].markdown(texts["summary"], unsafe_allow_html=True)
+        if "full_transcript" in updated:
+            with previews["full_transcript"].container():
+                st.caption(f"{len(texts['full_transcript']):,} characters so far; the whole transcript is shown when it is done")
+                st.markdown(transcript_tail(texts["full_transcript"]), unsafe_allow_html=True)
+        status.info(job["progress"] or "Waiting for a free worker...", icon=":material/hourglass_top:")
+        time.sleep(JOB_PREVIEW_SECONDS)
+
+def wait_for_job(job_id, message):
+    # Waits for a summary job to end and returns it
+    queue = get_job_queue()
+    with st.spinner(message):
+        while True:
+            job = queue.get(job_id)
+            if job is None or job["status"] in (DONE, FAILED):
+                return job
+            time.sleep(JOB_POLL_SECONDS)
+
+def seek_video(seconds):
+    st.session_state.video_start = int(seconds)
+
+def go_to_transcript_page(page_key, page):
+    st.session_state[page_key] = page
     
 
 def main():
@@ -57,6 +189,20 @@ def main():
     
         st.session_state.condition_yt = condition_yt
 
+    # A reloaded page picks up its job from the URL
+    job_id = st.query_params.get("job")
+    if job_id and st.session_state.job_id is None:
+        job = get_job_queue().get(job_id)
+        if job is None:
+            st.query_params.pop("job", None)
+        else:
+            st.session_state.job_id = job_id
+            st.session_state[f"yt_{st.session_state.youtube_key}"] = job["params"]["url"]
+            st.session_state.condition_yt = True
+            st.session_state.previous_url = job["params"]["url"]
+            st.session_state.disabled_button = True
+            st.session_state.language_settings_disabled = True
+
     with st.sidebar:
         st.markdown('<div class="area-title">Input your Gemini API key</div>', unsafe_allow_html=True)
         
@@ -71,18 +217,29 @@ def main():
         new_key = api_container.text_input("Gemini API Key", type="password", key="gemini_api_key")
 
         if st.button("Validate API Key"):
-            try:
-                llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-001", google_api_key=new_key)
-                response = llm.invoke("Test connection")
+            if validate_api_key(new_key):
                 st.session_state.api_key_validated = True
                 st.success("API key is validated and ready to use")
-            except Exception:
+            else:
                 st.session_state.api_key_validated = False
                 st.error("Invalid API key. Please check and try again.")
             
 
         "[Get a Gemini API key](https://ai.google.dev/gemini-api/docs/api-key)"
 
+        # Every processed video is indexed on disk, so earlier videos can be found by what was said
+        st.markdown('<div class="area-title">Search processed videos</div>', unsafe_allow_html=True)
+        library_query = st.text_input("Which video talked about...", key="library_query", placeholder="e.g. rate limits")
+        if library_query:
+            results = get_search_index().search(library_query, limit=LIBRARY_SEARCH_RESULTS)
+            if not results:
+                st.caption("No matches")
+            for video in results:
+                st.markdown(f"**{video['title']}**")
+                for hit in video["hits"]:
+                    label = format_timestamp(hit["start"]) if hit["start"] is not None else "transcript"
+                    st.markdown(f"[{label}]({hit_url(video['video_id'], hit['start'])}) {hit['snippet']}")
+
     # YouTube URL input
     st.text_input(
         "YouTube Link:",
@@ -96,6 +253,9 @@ def main():
         # VIDEO section
         st.markdown('<div class="area-title">Your Video</div>', unsafe_allow_html=True)
         emb_youtube_url = convert_youtube_url(st.session_state[f"yt_{st.session_state.youtube_key}"])
+        if st.session_state.video_start:
+            # Jump to the chapter picked in the Chapters tab
+            emb_youtube_url += f"?start={st.session_state.video_start}&autoplay=1"
         st.markdown(f'<iframe width="100%" height="450" src="{emb_youtube_url}" frameBorder="0" allow="clipboard-write; autoplay" webkitAllowFullScreen mozallowfullscreen allowFullScreen></iframe>', unsafe_allow_html=True)
         
         vid_info = get_video_info(st.session_state[f"yt_{st.session_state.youtube_key}"])
@@ -112,7 +272,7 @@ def main():
         ''', unsafe_allow_html=True)
 
     # Check if previous URL changed to clear outputs
-    if st.session_state.summary is not None:
+    if st.session_state.summary_key is not None or st.session_state.job_id is not None:
         if (st.session_state.condition_yt and st.session_state.previous_url != st.session_state[f"yt_{st.session_state.youtube_key}"]):
             clear_outputs()
             st.session_state.disabled_button = False
@@ -146,9 +306,27 @@ def main():
             with col2:
                 lang_option = st.selectbox(
                     "What language do you prefer?",
-                    ("English", "Dutch", "Russian"),
+                    SUMMARY_LANGUAGES,
                     disabled=st.session_state.use_original_language or st.session_state.language_settings_disabled,
                 )
+            # One summary is made, then translated into each extra language with short concurrent calls
+            extra_languages = st.multiselect(
+                "Also translate the summary into",
+                SUMMARY_LANGUAGES,
+                disabled=st.session_state.language_settings_disabled,
+            )
+            other_languages = st.text_input(
+                "Other languages (comma-separated)",
+                placeholder="e.g. Swedish, Greek",
+                disabled=st.session_state.language_settings_disabled,
+            )
+            extra_languages += [language.strip() for language in other_languages.split(",") if language.strip()]
+            chapter_mode = st.toggle(
+                "Summarize each chapter",
+                value=False,
+                help="Adds chapter summaries with timestamps, using the video's chapters or 5-minute sections",
+                disabled=st.session_state.language_settings_disabled
+            )
         if st.session_state.use_original_language:
             lang_option = ""
         
@@ -173,81 +351,155 @@ def main():
                     disabled=st.session_state.disabled_button)  # Disable if already clicked
 
             if generate_content_button:
-                start_time = time.time()
-                # Check API key first
-                st.session_state.disabled_button = True
-                with st.spinner("Processing subtitles..."):
-
-                    try:
-                        # Get subtitles
-                        if captions_lang is None:
-                            st.error("No subtitle language selected.")
-                            st.session_state.disabled_button = False
-                            return
-                            
-                        subtitles_text = retrieve_subtitles(st.session_state[f"yt_{st.session_state.youtube_key}"], captions_lang)
-                        
-                        if not subtitles_text.strip():
-                            st.error("Could not retrieve subtitles. Please try a different video.")
-                            st.session_state.disabled_button = False
-                            return
-                        
-                        st.info(f"Using subtitles in {captions_lang}", icon=":material/closed_caption:")
-                        
-                        # Process subtitles
-                        summary = summarize_text(subtitles_text, chosen_language=lang_option, gemini_key=st.session_state.gemini_api_key)
-                        full_transcript = get_full_transcription(subtitles_text, gemini_key=st.session_state.gemini_api_key)
-                        
-                        st.session_state.summary = summary
-                        st.session_state.full_transcript = full_transcript
-                        st.session_state.previous_url = st.session_state[f"yt_{st.session_state.youtube_key}"]
-
-                        end_time = time.time()  # End timer
-                        elapsed_time = end_time - start_time  # Calculate duration
-                        st.info(f"Time taken: {elapsed_time:.2f} seconds", icon=":material/timer:")
-                        
-                    except Exception as e:
-                        st.error(f"An error occurred: {str(e)}")
-                        st.session_state.disabled_button = False
-
-    if st.session_state.summary:
-        tab1, tab2 = st.tabs(["Summary", "Full Transcript"])
+                if captions_lang is None:
+                    st.error("No subtitle language selected.")
+                    st.session_state.disabled_button = False
+                    return
+                # The video is processed by a worker; identical jobs (same video and settings) are shared
+                url = st.session_state[f"yt_{st.session_state.youtube_key}"]
+                params = {
+                    "url": url,
+                    "caption_language": captions_lang,
+                    "chosen_language": lang_option,
+                    "extra_languages": list(dict.fromkeys(extra_languages)),
+                    "chapters": chapter_mode,
+                }
+                st.session_state.job_id = get_job_queue().submit(params, st.session_state.gemini_api_key)
+                st.session_state.previous_url = url
+                st.query_params["job"] = st.session_state.job_id
+
+    # Poll the job until its outputs are ready
+    if st.session_state.job_id is not None and st.session_state.summary_key is None:
+        job = get_job_queue().get(st.session_state.job_id)
+        if job is None or job["status"] == FAILED:
+            st.error(f"An error occurred: {job['error'] if job else 'the job no longer exists'}")
+            st.session_state.job_id = None
+            st.query_params.pop("job", None)
+            st.session_state.disabled_button = False
+            st.session_state.language_settings_disabled = False
+        elif job["status"] == DONE:
+            apply_job_result(job)
+            result = job["result"]
+            st.info(f"Using subtitles in {result['caption_language']}", icon=":material/closed_caption:")
+            compaction = result["compaction"]
+            saved = compaction["tokens_before"] - compaction["tokens_after"] if compaction else 0
+            if saved > 0:
+                st.info(f"Subtitles compacted from ~{compaction['tokens_before']} to ~{compaction['tokens_after']} tokens "
+                        f"({saved / compaction['tokens_before']:.0%} less)", icon=":material/compress:")
+            estimate = result.get("estimate")
+            estimated = f" (estimated ~{estimate['latency']:.0f} s, ~${estimate['cost']:.4f})" if estimate else ""
+            st.info(f"Processed in {job['finished_at'] - job['created_at']:.2f} seconds{estimated}", icon=":material/timer:")
+        else:
+            follow_job(st.session_state.job_id)
+            # The finished job's outputs are shown by the next run
+            st.rerun()
+
+    summary = get_shared_text(st.session_state.summary_key) if st.session_state.summary_key else None
+    full_transcript = get_shared_text(st.session_state.transcript_key) if st.session_state.transcript_key else None
+    if st.session_state.summary_key and (summary is None or full_transcript is None):
+        st.warning("The results of this video are no longer cached. Please generate them again.")
+        clear_outputs()
+        st.session_state.disabled_button = False
+        st.session_state.language_settings_disabled = False
+
+    if summary:
+        tab_names = ["Summary", "Full Transcript"]
+        if st.session_state.chapter_summaries:
+            tab_names.append("Chapters")
+        tab1, tab2, *tab3 = st.tabs(tab_names)
         with tab1:
             col1, col2 = st.columns([2,1])
             with col1:
-                if st.button("Re-generate Summary", type='secondary'):
+                # A changed output language translates the current summary instead of re-reading the transcript
+                translate = lang_option != st.session_state.summary_language
+                regenerate_label = f"Translate to {lang_option or 'original language'}" if translate else "Re-generate Summary"
+                if st.button(regenerate_label, type='secondary'):
                     if not st.session_state.gemini_api_key:
                         st.error("Please enter your Gemini API key in the sidebar")
                         return
-                    # Re-get subtitles and regenerate summary
-                    captions = find_captions(st.session_state[f"yt_{st.session_state.youtube_key}"])
-                    lang_list = list(captions.values())
-                    if lang_list:
-                        subtitles_text = retrieve_subtitles(st.session_state[f"yt_{st.session_state.youtube_key}"], lang_list[0])
-                        summary = summarize_text(subtitles_text, chosen_language=lang_option, gemini_key=st.session_state.gemini_api_key)
-                        st.session_state.summary = summary
+                    # Run by a worker like whole videos; a translation of the same summary is shared,
+                    # while every re-generation is a new job
+                    params = {
+                        "action": TRANSLATE if translate else REGENERATE,
+                        "url": st.session_state[f"yt_{st.session_state.youtube_key}"],
+                        "caption_language": st.session_state.caption_language,
+                        "caption_code": st.session_state.caption_code,
+                        "chosen_language": lang_option,
+                    }
+                    if translate:
+                        params["summary_key"] = st.session_state.summary_key
+                    else:
+                        params["request"] = uuid.uuid4().hex
+                    job_id = get_job_queue().submit(params, st.session_state.gemini_api_key)
+                    job = wait_for_job(job_id, "Translating summary..." if translate else "Re-generating summary...")
+                    if job is None or job["status"] == FAILED:
+                        st.error(f"An error occurred: {job['error'] if job else 'the job no longer exists'}")
+                    else:
+                        # The worker saved the summary in the result store; drop this process's copy of the old one
+                        get_shared_store().pop(job["result"]["summary_key"])
+                        st.session_state.summary_key = job["result"]["summary_key"]
+                        st.session_state.summary_language = job["result"]["summary_language"]
+                        # Refresh the button label for the new summary language
+                        st.rerun()
 
             st.markdown(f'''
                 <div style="margin-bottom: 15px;">
-                    <p style="font-size: 16px; line-height: 1.5; color: #ffffff;">{st.session_state.summary}</p>
+                    <p style="font-size: 16px; line-height: 1.5; color: #ffffff;">{get_shared_text(st.session_state.summary_key)}</p>
                 </div>
             ''', unsafe_allow_html=True)
 
+            for language, key in (st.session_state.translation_keys or {}).items():
+                with st.expander(f"Summary in {language}"):
+                    st.markdown(get_shared_text(key) or "This translation is no longer cached.")
+
         with tab2:
+            # Only the visible page is sent to the browser; pages and search come from an index built once per transcript
+            transcript_index = get_transcript_index(st.session_state.transcript_key, full_transcript)
+            # One page widget per transcript, so a new video starts on its first page
+            page_key = f"transcript_page_{st.session_state.transcript_key}"
             col1,col2,_ = st.columns([2,1,1])
             with col1:
+                # Served from the shared store; the session holds no copy of the transcript
                 st.download_button(
                     label="Download Transcript",
-                    data=st.session_state.full_transcript,
+                    data=full_transcript,
                     icon=":material/download:",
                     file_name=f"Transcript of {st.session_state.video_title}.txt",
                     mime="text/plain")
 
+            query = st.text_input("Search the transcript", key="transcript_query", placeholder="Words to find")
+            if query:
+                hits = transcript_index.search(query, limit=TRANSCRIPT_SEARCH_RESULTS)
+                if not hits:
+                    st.caption("No matches")
+                for paragraph, snippet in hits:
+                    page = transcript_index.page_of(paragraph)
+                    st.button(f"Page {page + 1}: {snippet}", key=f"transcript_hit_{paragraph}",
+                              on_click=go_to_transcript_page, args=(page_key, page + 1))
+
+            if transcript_index.pages > 1:
+                st.number_input(f"Page (of {transcript_index.pages})", min_value=1, max_value=transcript_index.pages,
+                                key=page_key)
+            page_text = transcript_index.page(min(st.session_state.get(page_key, 1), transcript_index.pages) - 1)
+            if query:
+                page_text = highlight(page_text, query)
+
             st.markdown(f'''
                 <div style="margin-bottom: 15px;">
-                    <p style="font-size: 16px; line-height: 1.5; color: #ffffff;">{st.session_state.full_transcript}</p>
+                    <p style="font-size: 16px; line-height: 1.5; color: #ffffff;">{page_text}</p>
                 </div>
             ''', unsafe_allow_html=True)
+
+        if tab3:
+            with tab3[0]:
+                for i, chapter in enumerate(st.session_state.chapter_summaries):
+                    col1, col2 = st.columns([1,4])
+                    with col1:
+                        st.button(format_timestamp(chapter["start"]), key=f"chapter_{i}", icon=":material/play_arrow:",
+                                  on_click=seek_video, args=(chapter["start"],))
+                    with col2:
+                        st.markdown(f'<p style="font-size: 16px; font-weight: bold; color: #1DB954; margin-bottom: 5px;">{chapter["title"]}</p>', unsafe_allow_html=True)
+                        st.markdown(chapter["summary"])
         
     st.divider() 
 
@@ -0,0 +1,253 @@
+"""
+Headless batch runner: summarizes lists of YouTube URLs and playlists without the Streamlit UI.
+
+Usage:
+    python batch.py urls.txt -o results.jsonl
+    cat urls.txt | python batch.py --transcript --language English > results.jsonl
+
+Results are written as one JSON object per line as soon as each video is done.
+Videos already present in the output file are skipped.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.llm_actions import get_full_transcription, result_key, summarize_languages, summarize_text
+from src.media_processing import find_captions, get_video_info
+from src.metrics import metrics
+from src.pipeline import load_subtitles
+from src.rate_limiter import BATCH
+from src.result_store import get_result_store
+from src.text_processing import estimate_tokens
+from src.utils import extract_video_id
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """
+    Reads video and playlist URLs, one per line, skipping blanks and # comments.
+
+    Playlist URLs are expanded into the URLs of their videos.
+
+    Args:
+        lines (Iterable[str]): The input lines.
+
+    Returns:
+        List[str]: The video URLs, without duplicates, in input order.
+    """
+    urls = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "list=" in line and "v=" not in line:
+            from pytubefix import Playlist
+
+            expanded = list(Playlist(line).video_urls)
+        else:
+            expanded = [line]
+        for url in expanded:
+            try:
+                video_id = extract_video_id(url)
+            except ValueError:
+                print(f"Skipping invalid YouTube URL: {url}", file=sys.stderr)
+                continue
+            if video_id not in seen:
+                seen.add(video_id)
+                urls.append(url)
+    return urls
+
+
+def read_done_ids(path: Optional[str]) -> Set[str]:
+    """Returns the IDs of the videos already processed successfully in an existing output file."""
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record.get("video_id"))
+    return done
+
+
+def pick_caption(captions: Dict[str, str], preferred: List[str]) -> Optional[str]:
+    """
+    Picks the caption track to use.
+
+    Args:
+        captions (Dict[str, str]): Caption language codes mapped to display names, from `find_captions`.
+        preferred (List[str]): Preferred language codes in order; manual tracks ("en") win over auto-generated ones ("a.en").
+
+    Returns:
+        Optional[str]: The display name of the chosen track, or None if the video has no captions.
+    """
+    for code in preferred:
+        for candidate in (code, f"a.{code}"):
+            if candidate in captions:
+                return captions[candidate]
+    return next(iter(captions.values()), None)
+
+
+class BatchRunner:
+    """
+    Processes videos on a worker pool with separate concurrency limits for YouTube fetches and Gemini calls.
+
+    Args:
+        gemini_key (str): Gemini API key.
+        chosen_language (str): The summary language ("" for the original language).
+        caption_languages (List[str]): Preferred caption language codes.
+        with_transcript (bool): Whether to also create the full transcript.
+        translate_languages (List[str]): Extra languages the summary is translated into.
+        youtube_concurrency (int): Maximum number of videos fetching from YouTube at once.
+        gemini_concurrency (int): Maximum number of videos in the LLM stage at once.
+    """
+
+    def __init__(self, gemini_key: str, chosen_language: str = "", caption_languages: List[str] = None,
+                 with_transcript: bool = False, youtube_concurrency: int = 4, gemini_concurrency: int = 4,
+                 translate_languages: List[str] = None):
+        self.gemini_key = gemini_key
+        self.chosen_language = chosen_language
+        self.caption_languages = caption_languages or []
+        self.with_transcript = with_transcript
+        self.translate_languages = translate_languages or []
+        self.youtube_slots = threading.Semaphore(youtube_concurrency)
+        self.gemini_slots = threading.Semaphore(gemini_concurrency)
+
+    def process(self, url: str) -> dict:
+        """Runs the pipeline for one video and returns its result record; errors are reported in the record."""
+        start_time = time.time()
+        record = {"url": url, "video_id": extract_video_id(url)}
+        try:
+            with self.youtube_slots:
+                info = get_video_info(url)
+                record.update(title=info["title"], length=info["length"])
+                captions = find_captions(url)
+                caption_name = pick_caption(captions, self.caption_languages)
+                if caption_name is None:
+                    raise RuntimeError("No subtitles available for this video")
+                # Checkpointed on disk, so a rerun after an error does not download the subtitles again
+                _, subtitles_text, _ = load_subtitles(url, caption_name)
+            record.update(caption_language=caption_name, input_tokens=estimate_tokens(subtitles_text))
+            caption_code = next(code for code, name in captions.items() if name == caption_name)
+
+            with self.gemini_slots:
+                record["summary"] = summarize_text(subtitles_text, chosen_language=self.chosen_language, gemini_key=self.gemini_key,
+                                                   video_id=record["video_id"], caption_language=caption_name, priority=BATCH,
+                                                   caption_code=caption_code)
+                if self.translate_languages:
+                    record["translations"] = summarize_languages(subtitles_text, self.translate_languages, gemini_key=self.gemini_key,
+                                                                 video_id=record["video_id"], caption_language=caption_name,
+                                                                 canonical_language=self.chosen_language, summary_text=record["summary"],
+                                                                 priority=BATCH, caption_code=caption_code)
+                if self.with_transcript:
+                    record["full_transcript"] = get_full_transcription(subtitles_text, gemini_key=self.gemini_key,
+                                                                       video_id=record["video_id"], caption_language=caption_name, priority=BATCH)
+                    # Only complete transcripts are saved: with a segment left unformatted the video
+                    # is recorded as an error, so the next run tries it again
+                    if not get_result_store().has(result_key("full_transcript", subtitles_text, record["video_id"], caption_name)):
+                        raise RuntimeError("The full transcript could not be formatted completely")
+            record["status"] = "ok"
+        except Exception as e:
+            record.update(status="error", error=str(e))
+        record["elapsed"] = round(time.time() - start_time, 2)
+        return record
+
+    def run(self, urls: List[str], output, workers: int) -> Dict[str, int]:
+        """
+        Processes all URLs and writes each result record to `output` as a JSON line as soon as it is ready.
+
+        Returns:
+            Dict[str, int]: The number of "ok" and "error" records.
+        """
+        counts = {"ok": 0, "error": 0}
+        write_lock = threading.Lock()
+
+        def work(url):
+            record = self.process(url)
+            with write_lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                counts[record["status"]] += 1
+                print(f"[{sum(counts.values())}/{len(urls)}] {record['status']}: {url}", file=sys.stderr)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(work, urls))
+        return counts
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarize YouTube videos and playlists from subtitles, without the UI.")
+    parser.add_argument("input", nargs="?", help="File with one video or playlist URL per line (default: stdin)")
+    parser.add_argument("-o", "--output", help="JSONL file to append results to (default: stdout)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"),
+                        help="Gemini API key (default: $GEMINI_API_KEY or $GOOGLE_API_KEY)")
+    parser.add_argument("--language", default="", help="Summary language (default: the original language)")
+    parser.add_argument("--translate", default="", help="Comma-separated extra languages the summary is translated into (e.g. German,French)")
+    parser.add_argument("--captions", default="en", help="Comma-separated preferred caption language codes (default: en)")
+    parser.add_argument("--transcript", action="store_true", help="Also create the full formatted transcript")
+    parser.add_argument("--workers", type=int, default=8, help="Number of videos processed at once (default: 8)")
+    parser.add_argument("--youtube-concurrency", type=int, default=4, help="Maximum concurrent YouTube fetches (default: 4)")
+    parser.add_argument("--gemini-concurrency", type=int, default=4, help="Maximum videos in the Gemini stage at once (default: 4)")
+    parser.add_argument("--metrics-file", help="Write per-stage metrics in the Prometheus text format to this file when done")
+    parser.add_argument("--metrics-log", action="store_true", help="Log every stage run as a JSON line on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.api_key:
+        print("A Gemini API key is required: pass --api-key or set GEMINI_API_KEY", file=sys.stderr)
+        return 2
+
+    if args.metrics_log:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as file:
+            urls = read_urls(file)
+    else:
+        urls = read_urls(sys.stdin)
+
+    done = read_done_ids(args.output)
+    pending = [url for url in urls if extract_video_id(url) not in done]
+    if len(pending) < len(urls):
+        print(f"Skipping {len(urls) - len(pending)} videos already in {args.output}", file=sys.stderr)
+
+    runner = BatchRunner(
+        gemini_key=args.api_key,
+        chosen_language=args.language,
+        caption_languages=[code.strip() for code in args.captions.split(",") if code.strip()],
+        with_transcript=args.transcript,
+        translate_languages=[language.strip() for language in args.translate.split(",") if language.strip()],
+        youtube_concurrency=args.youtube_concurrency,
+        gemini_concurrency=args.gemini_concurrency,
+    )
+    start_time = time.time()
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        counts = runner.run(pending, output, workers=args.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.metrics_file:
+        metrics.write_file(args.metrics_file)
+
+    elapsed = time.time() - start_time
+    rate = len(pending) / elapsed * 60 if elapsed else 0.0
+    print(f"Done: {counts['ok']} ok, {counts['error']} failed in {elapsed:.1f}s ({rate:.1f} videos/min)", file=sys.stderr)
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
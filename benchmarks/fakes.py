@@ -0,0 +1,200 @@
+"""
+Local stand-ins for pytubefix.YouTube and ChatGoogleGenerativeAI, so the pipeline can be measured without network.
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.text_processing import estimate_tokens
+from src.utils import extract_video_id
+
+# Speaking rate of the synthetic caption tracks
+WORDS_PER_MINUTE = 150
+CAPTION_SECONDS = 3.0
+
+_VOCABULARY = (
+    "the model data we think that really about system people time going actually question network "
+    "summary video because learning example important different problem right kind point look start "
+    "research quality result memory latency throughput cache language python design simple user"
+).split()
+
+
+def synthetic_events(minutes: float, seed: int = 0) -> List[dict]:
+    """
+    Builds a json3-style caption track of the given length that looks like YouTube auto-captions.
+
+    Consecutive captions repeat the tail of the previous one and non-speech tags are sprinkled in,
+    so compaction has realistic work to do.
+    """
+    rng = random.Random(seed)
+    events = []
+    words_per_caption = max(1, round(WORDS_PER_MINUTE * CAPTION_SECONDS / 60))
+    previous = []
+    for i in range(int(minutes * 60 / CAPTION_SECONDS)):
+        if rng.random() < 0.02:
+            text = "[Music]"
+        else:
+            words = [rng.choice(_VOCABULARY) for _ in range(words_per_caption)]
+            # Rolling auto-captions repeat the end of the previous line
+            text = " ".join(previous[-3:] + words) if previous and rng.random() < 0.5 else " ".join(words)
+            previous = words
+        if i % 40 == 39:
+            text += "."
+        events.append({"tStartMs": int(i * CAPTION_SECONDS * 1000), "dDurationMs": int(CAPTION_SECONDS * 1000), "segs": [{"utf8": text}]})
+    return events
+
+
+class FakeCaption:
+    def __init__(self, code: str, name: str, events: List[dict]):
+        self.code = code
+        self.name = name
+        self._events = events
+
+    @property
+    def json_captions(self) -> dict:
+        return {"events": self._events}
+
+    def generate_txt_captions(self) -> str:
+        # Like pytubefix, every caption on one line
+        return " ".join("".join(seg["utf8"] for seg in event["segs"]) for event in self._events)
+
+
+class FakeCaptionQuery:
+    def __init__(self, captions: List[FakeCaption]):
+        self._captions = {caption.code: caption for caption in captions}
+
+    @property
+    def lang_code_index(self) -> Dict[str, FakeCaption]:
+        return self._captions
+
+    def __getitem__(self, code: str) -> FakeCaption:
+        return self._captions[code]
+
+    def __bool__(self) -> bool:
+        return bool(self._captions)
+
+
+class FakeChapter:
+    def __init__(self, title: str, start_seconds: float):
+        self.title = title
+        self.start_seconds = start_seconds
+
+
+class FakeYouTubeFactory:
+    """
+    Creates fake `YouTube` objects serving registered caption tracks after a simulated network delay.
+
+    Args:
+        fetch_latency (float): Seconds spent "fetching" each new YouTube object.
+    """
+
+    def __init__(self, fetch_latency: float = 0.3):
+        self.fetch_latency = fetch_latency
+        self.videos = {}
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def add_video(self, video_id: str, title: str, events: List[dict]) -> str:
+        """Registers a video and returns its URL."""
+        self.videos[video_id] = (title, events)
+        return f"https://www.youtube.com/watch?v={video_id}"
+
+    def add_recorded(self, path: str) -> str:
+        """Registers a recorded json3 caption file; the file name (without extension) is used as title."""
+        with open(path, encoding="utf-8") as file:
+            events = json.load(file)["events"]
+        name = os.path.splitext(os.path.basename(path))[0]
+        video_id = (name.replace(" ", "_") + "_" * 11)[:11]
+        return self.add_video(video_id, name, events)
+
+    def __call__(self, url: str, *args, **kwargs):
+        time.sleep(self.fetch_latency)
+        with self._lock:
+            self.fetches += 1
+        title, events = self.videos[extract_video_id(url)]
+        yt = type("FakeYouTube", (), {})()
+        yt.title = title
+        yt.length = int(events[-1]["tStartMs"] / 1000 + CAPTION_SECONDS) if events else 0
+        yt.captions = FakeCaptionQuery([FakeCaption("a.en", "English (auto-generated)", events)])
+        yt.chapters = [FakeChapter(f"Part {i + 1}", start) for i, start in enumerate(range(0, yt.length, 15 * 60))]
+        return yt
+
+
+class ResourceExhausted(Exception):
+    # Mirrors google.api_core.exceptions.ResourceExhausted, which the scheduler retries by name and code
+    code = 429
+
+
+class _FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    """
+    Simulated Gemini chat model with configurable latency, throughput and error rate.
+
+    A call takes `latency` seconds before the first token plus output tokens / `throughput`.
+    Formatting prompts answer with text about as long as the transcript; other prompts answer
+    with a summary of at most `summary_tokens`.
+
+    Args:
+        latency (float): Time to first token in seconds.
+        throughput (float): Output tokens per second.
+        error_rate (float): Probability that a call fails with a rate-limit error.
+        summary_tokens (int): Length of summary answers in tokens.
+        seed (Optional[int]): Seed of the error generator.
+    """
+
+    def __init__(self, latency: float = 0.5, throughput: float = 200.0, error_rate: float = 0.0,
+                 summary_tokens: int = 600, seed: Optional[int] = None):
+        self.latency = latency
+        self.throughput = throughput
+        self.error_rate = error_rate
+        self.summary_tokens = summary_tokens
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str = "", google_api_key: str = "", **kwargs) -> "FakeChatModel":
+        # Stands in for the ChatGoogleGenerativeAI constructor; all clients share the same settings
+        return self
+
+    def get_num_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def _answer(self, prompt) -> str:
+        text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+            self.failures += int(failed)
+        time.sleep(self.latency)
+        if failed:
+            raise ResourceExhausted("Resource exhausted: simulated quota error")
+        # The transcript appears twice in the prompt: in the system template and as the user message
+        input_tokens = estimate_tokens(text) // 2
+        if "Raw Transcription" in text:
+            output_tokens = int(input_tokens * 0.9)
+        else:
+            output_tokens = min(self.summary_tokens, max(50, input_tokens // 4))
+        words = text.split()
+        return " ".join(words[i % len(words)] for i in range(output_tokens)) if words else ""
+
+    def invoke(self, prompt, **kwargs) -> _FakeMessage:
+        answer = self._answer(prompt)
+        time.sleep(estimate_tokens(answer) / self.throughput)
+        return _FakeMessage(answer)
+
+    def stream(self, prompt, **kwargs) -> Iterator[_FakeMessage]:
+        answer = self._answer(prompt)
+        words = answer.split(" ")
+        step = 20
+        for i in range(0, len(words), step):
+            piece = " ".join(words[i:i + step]) + " "
+            time.sleep(estimate_tokens(piece) / self.throughput)
+            yield _FakeMessage(piece)
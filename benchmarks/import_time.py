@@ -0,0 +1,116 @@
+"""
+Import-time and per-rerun payload report for the Streamlit app.
+
+Imports the app's modules in a fresh interpreter under `python -X importtime` and reports the
+total, the slowest top-level imports and which heavy SDKs ended up loaded. The SDKs are then
+imported the same way to show what start-up used to pay for them. Finally it compares the CSS
+sent on every rerun with the old inline base64 background.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --top 15 --include-streamlit
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+APP_PATH = "app.py"
+# Loaded on first use since they dominate start-up time
+HEAVY_MODULES = ("langchain_core.prompts", "langchain_google_genai", "langdetect", "pytubefix")
+BACKGROUND_PATH = os.path.join("static", "background.jpg")
+
+
+def app_modules(path: str = APP_PATH) -> List[str]:
+    """Returns the modules of this repository that the app imports at module level, read from its source."""
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src."):
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names if alias.name.startswith("src.")]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return modules
+
+
+def profile_imports(modules: List[str]) -> Tuple[List[Tuple[str, int]], List[str], str]:
+    """
+    Imports `modules` in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple[List[Tuple[str, int]], List[str], str]: The top-level imports with their cumulative
+        time in microseconds, the heavy modules found in sys.modules afterwards, and the error if the import failed.
+    """
+    code = (
+        "import sys\n"
+        f"for name in {list(modules)!r}:\n"
+        "    __import__(name)\n"
+        f"print(','.join(m for m in {list(HEAVY_MODULES)!r} if m in sys.modules))\n"
+    )
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented; only top-level ones add up to the total
+        if not name.startswith("  "):
+            imports.append((name.strip(), int(cumulative)))
+    error = ""
+    if process.returncode != 0:
+        error = [line for line in process.stderr.splitlines() if not line.startswith("import time:")][-1:]
+        error = error[0] if error else f"exit code {process.returncode}"
+    loaded = [name for name in process.stdout.strip().split(",") if name]
+    return imports, loaded, error
+
+
+def report(label: str, modules: List[str], top: int) -> int:
+    imports, loaded, error = profile_imports(modules)
+    # Leave out what the interpreter imports at start-up anyway
+    startup = {name for name, _ in profile_imports([])[0]}
+    imports = [(name, cumulative) for name, cumulative in imports if name not in startup]
+    total = sum(cumulative for _, cumulative in imports)
+    print(f"{label}: {total / 1000:.1f} ms")
+    if error:
+        print(f"  import failed: {error}")
+    for name, cumulative in sorted(imports, key=lambda item: -item[1])[:top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+    print(f"  heavy SDKs loaded: {', '.join(loaded) if loaded else 'none'}")
+    return total
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Report the import time of the app and the bytes sent on each rerun.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports listed (default: 10)")
+    parser.add_argument("--include-streamlit", action="store_true", help="Also import streamlit, like the app does")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    modules = (["streamlit"] if args.include_streamlit else []) + app_modules()
+    app_total = report("App modules", modules, args.top)
+    print()
+    sdk_total = report("Heavy SDKs, deferred to first use", list(HEAVY_MODULES), args.top)
+    print(f"\nStart-up no longer pays ~{sdk_total / 1000:.1f} ms for the SDKs (app modules now: {app_total / 1000:.1f} ms)")
+
+    from src.utils import style_css
+
+    css_bytes = len(style_css().encode("utf-8"))
+    if os.path.exists(BACKGROUND_PATH):
+        image_bytes = os.path.getsize(BACKGROUND_PATH)
+        # Base64 takes 4 characters for every 3 bytes
+        inline_bytes = css_bytes + 4 * -(-image_bytes // 3)
+        print(f"\nCSS sent per rerun: {css_bytes:,} bytes (was {inline_bytes:,} with the inline base64 background); "
+              f"the {image_bytes:,}-byte image is fetched once from /app/static and cached by the browser")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Offline benchmark of the summarization pipeline.
+
+pytubefix.YouTube and ChatGoogleGenerativeAI are replaced by the local fakes in benchmarks/fakes.py,
+so this runs without network access or an API key.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --durations 5m,1h,4h --latency 1.0 --throughput 150 --error-rate 0.05
+    python -m benchmarks.run_benchmark --recorded path/to/captions_dir --json results.json
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+# Results of every run go to a throwaway cache, never the real one
+_cache_dir = tempfile.mkdtemp(prefix="video_summary_bench_")
+os.environ["RESULT_CACHE_PATH"] = os.path.join(_cache_dir, "results.sqlite3")
+os.environ["SEARCH_INDEX_PATH"] = os.path.join(_cache_dir, "search.sqlite3")
+
+import src.llm_actions as llm_actions  # noqa: E402
+import src.media_processing as media_processing  # noqa: E402
+import src.rate_limiter as rate_limiter  # noqa: E402
+import src.result_store as result_store  # noqa: E402
+from batch import BatchRunner  # noqa: E402
+from benchmarks.fakes import FakeChatModel, FakeYouTubeFactory, synthetic_events  # noqa: E402
+from src.metrics import metrics  # noqa: E402
+from src.pipeline import iter_llm_stream, run_llm_jobs  # noqa: E402
+from src.text_processing import compact_transcript, estimate_tokens  # noqa: E402
+
+MODES = ("baseline", "pipeline", "stream")
+FAKE_KEY = "benchmark-key"
+
+
+def parse_duration(value: str) -> float:
+    """Parses '5m', '1h', '90m' or '2.5h' into minutes."""
+    value = value.strip().lower()
+    if value.endswith("h"):
+        return float(value[:-1]) * 60
+    if value.endswith("m"):
+        return float(value[:-1])
+    return float(value)
+
+
+def reset_state(run_index: int) -> None:
+    # Fresh caches for every run, so each one measures real (fake) work
+    media_processing._video_cache.clear()
+    llm_actions._llm_clients.clear()
+    result_store._store = result_store.ResultStore(os.path.join(_cache_dir, f"results_{run_index}.sqlite3"))
+
+
+def run_video(url: str, mode: str) -> dict:
+    """Runs the pipeline for one video in the given mode and returns its timings."""
+    start_time = time.perf_counter()
+    media_processing.get_video_info(url)
+    caption_name = next(iter(media_processing.find_captions(url).values()))
+    subtitles_text = media_processing.retrieve_subtitles(url, caption_name)
+    video_id = url[-11:]
+    result = {"input_tokens": estimate_tokens(subtitles_text), "time_to_first_output": None}
+
+    if mode == "baseline":
+        # The original flow: one call per task, one after the other, on the raw captions
+        llm_actions.summarize_text(subtitles_text, chosen_language="", gemini_key=FAKE_KEY, video_id=video_id, mode="single")
+        result["time_to_first_output"] = time.perf_counter() - start_time
+        llm_actions.get_full_transcription(subtitles_text, gemini_key=FAKE_KEY, video_id=video_id, mode="single")
+    else:
+        subtitles_text, _ = compact_transcript(subtitles_text)
+        result["compacted_tokens"] = estimate_tokens(subtitles_text)
+        if mode == "pipeline":
+            run_llm_jobs(subtitles_text, chosen_language="", gemini_key=FAKE_KEY, video_id=video_id)
+            result["time_to_first_output"] = time.perf_counter() - start_time
+        else:
+            for _ in iter_llm_stream(subtitles_text, chosen_language="", gemini_key=FAKE_KEY, video_id=video_id):
+                if result["time_to_first_output"] is None:
+                    result["time_to_first_output"] = time.perf_counter() - start_time
+
+    result["end_to_end"] = time.perf_counter() - start_time
+    return result
+
+
+def measure(label: str, mode: str, fn, run_index: int) -> dict:
+    reset_state(run_index)
+    before = metrics.snapshot()
+    tracemalloc.start()
+    # The pipeline prints progress messages; keep the report readable
+    with redirect_stdout(io.StringIO()):
+        result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after = metrics.snapshot()
+    stages = {
+        stage: round(stats["duration_sum"] - before.get(stage, {}).get("duration_sum", 0.0), 3)
+        for stage, stats in after.items()
+        if stats["calls"] > before.get(stage, {}).get("calls", 0)
+    }
+    result.update(video=label, mode=mode, peak_memory_mb=round(peak / 2 ** 20, 1), stages=stages)
+    return result
+
+
+def warm_up(youtube, chat_model) -> None:
+    # Pays the lazy imports (LangChain, langdetect profiles, ...) once, outside the measured runs;
+    # otherwise the first mode measured carries them all
+    url = youtube.add_video("warmup00000", "Warm-up", synthetic_events(1))
+    for mode in MODES:
+        reset_state(-1)
+        with redirect_stdout(io.StringIO()):
+            run_video(url, mode)
+    chat_model.calls = chat_model.failures = 0
+    youtube.fetches = 0
+
+
+def run_batch(youtube, videos: int, minutes: float, workers: int, run_index: int) -> dict:
+    urls = [youtube.add_video(f"batch{i:06d}", f"Batch video {i}", synthetic_events(minutes, seed=1000 + i)) for i in range(videos)]
+
+    def work():
+        runner = BatchRunner(gemini_key=FAKE_KEY, with_transcript=True, youtube_concurrency=4, gemini_concurrency=4)
+        start_time = time.perf_counter()
+        counts = runner.run(urls, io.StringIO(), workers=workers)
+        elapsed = time.perf_counter() - start_time
+        return {"end_to_end": elapsed, "videos": videos, "failed": counts["error"], "videos_per_minute": videos / elapsed * 60}
+
+    return measure(f"batch {videos} x {minutes:g}m", "batch", work, run_index)
+
+
+def print_header() -> None:
+    print(f"{'video':<22}{'mode':<10}{'tokens':>9}{'first out s':>12}{'total s':>9}{'peak MB':>9}  slowest stages")
+
+
+def print_row(result: dict) -> None:
+    if result["mode"] == "batch":
+        print(f"{result['video']:<22}{'batch':<10}{'':>9}{'':>12}{result['end_to_end']:>9.2f}{result['peak_memory_mb']:>9.1f}  "
+              f"{result['videos_per_minute']:.1f} videos/min, {result['failed']} failed")
+        return
+    tokens = result.get("compacted_tokens", result["input_tokens"])
+    slowest = sorted(result["stages"].items(), key=lambda item: -item[1])[:3]
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in slowest)
+    print(f"{result['video']:<22}{result['mode']:<10}{tokens:>9}{result['time_to_first_output']:>12.2f}{result['end_to_end']:>9.2f}"
+          f"{result['peak_memory_mb']:>9.1f}  {stages}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline with fake YouTube and Gemini backends.")
+    parser.add_argument("--durations", default="5m,30m,1h,4h", help="Comma-separated synthetic video lengths (default: 5m,30m,1h,4h)")
+    parser.add_argument("--recorded", help="Directory of recorded json3 caption files to benchmark as well")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated modes among {', '.join(MODES)}")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM time to first token in seconds (default: 0.5)")
+    parser.add_argument("--throughput", type=float, default=200.0, help="Simulated LLM output tokens per second (default: 200)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a simulated 429 error per call (default: 0)")
+    parser.add_argument("--fetch-latency", type=float, default=0.3, help="Simulated YouTube fetch latency in seconds (default: 0.3)")
+    parser.add_argument("--rpm", type=int, default=10_000, help="Requests per minute given to the scheduler (default: 10000)")
+    parser.add_argument("--batch-videos", type=int, default=8, help="Videos in the batch throughput run, 0 to skip (default: 8)")
+    parser.add_argument("--batch-duration", default="10m", help="Length of each batch video (default: 10m)")
+    parser.add_argument("--batch-workers", type=int, default=8, help="Workers of the batch run (default: 8)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic tracks and simulated errors")
+    parser.add_argument("--no-warmup", action="store_true", help="Measure the first run cold, including the lazy imports")
+    parser.add_argument("--json", help="Also write the raw results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        print(f"Unknown modes: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    youtube = FakeYouTubeFactory(fetch_latency=args.fetch_latency)
+    chat_model = FakeChatModel(latency=args.latency, throughput=args.throughput, error_rate=args.error_rate, seed=args.seed)
+    media_processing.YouTube = youtube
+    llm_actions.ChatGoogleGenerativeAI = chat_model
+    rate_limiter._scheduler = rate_limiter.GeminiScheduler(rpm=args.rpm, tpm=10 ** 9)
+
+    videos = []
+    for i, duration in enumerate(args.durations.split(",")):
+        minutes = parse_duration(duration)
+        videos.append((duration.strip(), youtube.add_video(f"synth{i:06d}", f"Synthetic {duration}", synthetic_events(minutes, seed=args.seed + i))))
+    if args.recorded:
+        for path in sorted(glob.glob(os.path.join(args.recorded, "*.json"))):
+            videos.append((os.path.basename(path)[:20], youtube.add_recorded(path)))
+
+    if not args.no_warmup:
+        warm_up(youtube, chat_model)
+
+    results = []
+    print_header()
+    for label, url in videos:
+        for mode in modes:
+            results.append(measure(label, mode, lambda: run_video(url, mode), len(results)))
+            print_row(results[-1])
+    if args.batch_videos:
+        results.append(run_batch(youtube, args.batch_videos, parse_duration(args.batch_duration), args.batch_workers, len(results)))
+        print_row(results[-1])
+
+    print(f"\nLLM calls: {chat_model.calls}, simulated failures: {chat_model.failures}, YouTube fetches: {youtube.fetches}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Headless search over every processed video: finds which videos talked about something.
+
+Usage:
+    python search.py "quantum entanglement"
+    python search.py "rate limits" --limit 5 --json
+
+Captions hits link to their moment in the video; transcript hits link to the video.
+"""
+import argparse
+import json
+import sys
+import time
+
+from src.search_index import SEARCH_INDEX_PATH, SearchIndex, hit_url
+from src.utils import format_timestamp
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Search the captions and transcripts of all processed videos.")
+    parser.add_argument("query", help="Words to find; every word must appear in a passage")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum number of videos (default: 10)")
+    parser.add_argument("--hits", type=int, default=3, help="Maximum passages shown per video (default: 3)")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help=f"Path of the search index (default: {SEARCH_INDEX_PATH})")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    index = SearchIndex(args.index)
+    start_time = time.perf_counter()
+    results = index.search(args.query, limit=args.limit, hits_per_video=args.hits,
+                           highlight=("", "") if args.json else ("\033[1m", "\033[0m"))
+    elapsed = time.perf_counter() - start_time
+
+    if args.json:
+        for video in results:
+            for hit in video["hits"]:
+                hit["url"] = hit_url(video["video_id"], hit["start"])
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for video in results:
+            print(f"{video['title']}  (score {video['score']})")
+            for hit in video["hits"]:
+                timestamp = format_timestamp(hit["start"]) if hit["start"] is not None else "transcript"
+                print(f"  [{timestamp}] {hit['snippet']}")
+                print(f"      {hit_url(video['video_id'], hit['start'])}")
+    print(f"{len(results)} videos in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a time-to-live, LRU eviction and a single-flight guard.
+
+    Concurrent callers asking for the same missing key share one call to the loader
+    instead of each running it.
+
+    Args:
+        maxsize (int): Maximum number of entries kept before the least recently used is evicted.
+        ttl (float): Number of seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> threading.Event
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if it is missing or expired."""
+        with self._lock:
+            return self._get_locked(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Drop `key` from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` once to fill it on a miss.
+
+        Args:
+            key (Hashable): The cache key.
+            loader (Callable[[], Any]): Function producing the value. Exceptions are propagated
+                to the caller that ran it; waiting callers retry the load themselves.
+
+        Returns:
+            Any: The cached or freshly loaded value.
+        """
+        missing = object()
+        while True:
+            with self._lock:
+                value = self._get_locked(key, missing)
+                if value is not missing:
+                    return value
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    break
+            # Another thread is loading this key; wait for it and look again
+            event.wait()
+
+        try:
+            value = loader()
+            self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def _get_locked(self, key: Hashable, default: Any) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
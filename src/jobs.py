@@ -0,0 +1,590 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.rate_limiter import INTERACTIVE, is_transient, share_budget
+from src.result_store import get_result_store, make_key
+from src.utils import extract_video_id
+
+# Location of the persistent job queue shared by the app and the workers
+JOBS_PATH = os.environ.get("JOBS_PATH", os.path.join(".cache", "jobs.sqlite3"))
+# Worker processes the app starts itself; set to 0 when workers run separately (python worker.py)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_SECONDS = 1.0
+# Workers write the text of a running job, and the app reads it, in batches this far apart
+JOB_STREAM_SECONDS = 0.25
+# Workers export their metrics here, one file each; the app merges them into what it serves
+JOB_METRICS_DIR = os.environ.get("JOB_METRICS_DIR", os.path.join(".cache", "metrics"))
+# A running job whose worker has not reported for this long is handed to another worker
+JOB_HEARTBEAT_SECONDS = 10.0
+JOB_STALE_SECONDS = 120.0
+MAX_JOB_ATTEMPTS = 3
+
+# Job actions: the whole pipeline of a video, or a new or translated summary of a processed one
+PROCESS = "process"
+REGENERATE = "regenerate"
+TRANSLATE = "translate"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "error"
+
+
+def job_key(params: dict) -> str:
+    """Return the deduplication key of a job: the video and every setting that changes its result."""
+    action = params.get("action", PROCESS)
+    if action != PROCESS:
+        # Every re-generation is a new job ("request" differs); translations are shared like whole videos
+        return make_key(
+            task="job",
+            action=action,
+            video_id=extract_video_id(params["url"]),
+            caption_language=params["caption_language"],
+            chosen_language=params.get("chosen_language", ""),
+            request=params.get("request"),
+        )
+    return make_key(
+        task="job",
+        video_id=extract_video_id(params["url"]),
+        caption_language=params["caption_language"],
+        chosen_language=params.get("chosen_language", ""),
+        extra_languages=sorted(set(params.get("extra_languages", [])) - {params.get("chosen_language", "")}),
+        chapters=bool(params.get("chapters")),
+    )
+
+
+def _outputs_stored(result: Optional[dict]) -> bool:
+    # A finished job is only reused while the texts its result points to are still in the result store
+    if not result:
+        return False
+    if not result.get("summary_key"):
+        return False
+    # Summary jobs have no transcript
+    keys = [result["summary_key"], result.get("transcript_key"), *(result.get("translation_keys") or {}).values()]
+    store = get_result_store()
+    return all(store.has(key) for key in keys if key)
+
+
+class JobQueue:
+    """
+    Persistent SQLite-backed queue of video processing jobs.
+
+    Jobs are deduplicated by video and settings: submitting a job identical to a queued, running or
+    finished one returns that job, unless the outputs of the finished job were evicted from the result store.
+    Workers claim jobs atomically, report progress with heartbeats, append the summary and transcript
+    as they are written and store the result, so any process can follow a job by its ID.
+
+    The Gemini key of a job is stored in the database, readable only by its owner, until the job ends.
+
+    Args:
+        path (str): Path of the SQLite database file.
+    """
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Queued jobs hold their Gemini key; SQLite creates the WAL files with the same permissions
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        try:
+            os.chmod(path, 0o600)
+        except OSError as e:
+            print(f"Could not restrict the permissions of {path}: {e}")
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                dedup_key TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                params TEXT NOT NULL,
+                gemini_key TEXT,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at)")
+        # Pieces of the outputs of running jobs, in the order they were written
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_output (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                text TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_output_job ON job_output (job_id, seq)")
+
+    def submit(self, params: dict, gemini_key: str, priority: int = INTERACTIVE) -> str:
+        """
+        Queue a job, or return the ID of the identical job already queued, running or done.
+
+        A failed identical job, or a finished one whose outputs are no longer in the result store, is
+        queued again with the new key.
+
+        Args:
+            params (dict): The job settings: "url", "caption_language", and optionally "chosen_language",
+                "extra_languages" and "chapters". Summary jobs set "action" to REGENERATE (with a unique
+                "request") or TRANSLATE (with the "summary_key" of the summary to translate), and
+                may pass "caption_code".
+            gemini_key (str): Gemini API key the worker uses for this job.
+            priority (int): INTERACTIVE or BATCH; lower values are served first.
+
+        Returns:
+            str: The job ID.
+        """
+        key = job_key(params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT id, status, result FROM jobs WHERE dedup_key = ?", (key,)).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, dedup_key, status, priority, params, gemini_key, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, key, QUEUED, priority, json.dumps(params), gemini_key, now),
+                    )
+                else:
+                    job_id, status, result = row
+                    if status == FAILED or (status == DONE and not _outputs_stored(json.loads(result) if result else None)):
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, priority = ?, gemini_key = ?, progress = NULL, result = NULL, "
+                            "error = NULL, attempts = 0, worker = NULL, created_at = ?, started_at = NULL, finished_at = NULL WHERE id = ?",
+                            (QUEUED, priority, gemini_key, now, job_id),
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Return the status of a job, or None if it does not exist.
+
+        Returns:
+            Optional[dict]: "id", "status", "params", "progress", "result", "error", "attempts",
+            "created_at", "started_at" and "finished_at"; the Gemini key is never returned.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, params, progress, result, error, attempts, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "status", "params", "progress", "result", "error", "attempts",
+                        "created_at", "started_at", "finished_at"), row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Atomically take the next queued job for `worker`; returns its "id", "params" and "gemini_key", or None."""
+        now = time.time()
+        with self._lock:
+            # The write lock is taken before reading, so two workers never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, params, gemini_key FROM jobs WHERE status = ? ORDER BY priority, created_at LIMIT 1", (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (RUNNING, worker, now, now, row[0]),
+                    )
+                    # The text of an earlier attempt is written again from the start
+                    self._conn.execute("DELETE FROM job_output WHERE job_id = ?", (row[0],))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "params": json.loads(row[1]), "gemini_key": row[2]}
+
+    def heartbeat(self, job_id: str, progress: Optional[str] = None) -> None:
+        """Record that the job is alive, with optional progress text."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?, progress = COALESCE(?, progress) WHERE id = ? AND status = ?",
+                (time.time(), progress, job_id, RUNNING),
+            )
+
+    def append_output(self, job_id: str, worker: str, pieces: Dict[str, str]) -> None:
+        """
+        Append newly written text to the outputs of a running job.
+
+        Pieces from a worker that no longer runs the job (it was handed to another one) are dropped.
+
+        Args:
+            job_id (str): The job ID.
+            worker (str): The worker running the job.
+            pieces (Dict[str, str]): New text by output name ("summary", "full_transcript").
+        """
+        rows = [(job_id, name, text, job_id, worker, RUNNING) for name, text in pieces.items() if text]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO job_output (job_id, name, text) SELECT ?, ?, ? "
+                "WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = ?)",
+                rows,
+            )
+
+    def read_output(self, job_id: str, after: int = 0) -> Tuple[int, List[Tuple[str, str]]]:
+        """
+        Return the text appended to a running job's outputs since position `after`.
+
+        Returns:
+            Tuple[int, List[Tuple[str, str]]]: The position to read from next, and the (output name, text)
+            pieces in the order they were written.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, name, text FROM job_output WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after),
+            ).fetchall()
+        return (rows[-1][0] if rows else after), [(name, text) for _, name, text in rows]
+
+    def complete(self, job_id: str, result: dict) -> None:
+        """Store the result of a job and forget its Gemini key."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, gemini_key = NULL, finished_at = ? WHERE id = ?",
+                    (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id),
+                )
+                # The outputs are in the result store now
+                self._conn.execute("DELETE FROM job_output WHERE job_id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def fail(self, job_id: str, error: str, retry: bool = False) -> None:
+        """Mark a job as failed, or put it back in the queue if `retry` and attempts are left."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """UPDATE jobs SET
+                           status = CASE WHEN ? AND attempts < ? THEN ? ELSE ? END,
+                           gemini_key = CASE WHEN ? AND attempts < ? THEN gemini_key END,
+                           error = ?, worker = NULL, finished_at = ?
+                       WHERE id = ?""",
+                    (retry, MAX_JOB_ATTEMPTS, QUEUED, FAILED, retry, MAX_JOB_ATTEMPTS, error, time.time(), job_id),
+                )
+                self._conn.execute("DELETE FROM job_output WHERE job_id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """
+        Put running jobs whose worker stopped reporting back in the queue; returns their number.
+
+        A job that already used MAX_JOB_ATTEMPTS attempts fails instead, so a video that crashes its
+        worker is not retried forever.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """UPDATE jobs SET
+                       status = CASE WHEN attempts < ? THEN ? ELSE ? END,
+                       gemini_key = CASE WHEN attempts < ? THEN gemini_key END,
+                       error = CASE WHEN attempts < ? THEN error ELSE ? END,
+                       finished_at = CASE WHEN attempts < ? THEN finished_at ELSE ? END,
+                       worker = NULL
+                   WHERE status = ? AND heartbeat_at < ?""",
+                (MAX_JOB_ATTEMPTS, QUEUED, FAILED, MAX_JOB_ATTEMPTS, MAX_JOB_ATTEMPTS,
+                 "The worker stopped responding while processing this video; please try again",
+                 MAX_JOB_ATTEMPTS, now, RUNNING, now - stale_seconds),
+            )
+            if cursor.rowcount:
+                self._conn.execute("DELETE FROM job_output WHERE job_id NOT IN (SELECT id FROM jobs WHERE status = ?)", (RUNNING,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update(rows)
+        return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, opening it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def run_summary_job(params: dict, gemini_key: str, report: Callable[[str], None], priority: int = INTERACTIVE) -> dict:
+    """
+    Runs a summary job: a new summary of a processed video, skipping the cached one, or its translation.
+
+    Args:
+        params (dict): The job settings (see `JobQueue.submit`), with "action" REGENERATE or TRANSLATE.
+        gemini_key (str): Gemini API key.
+        report (Callable[[str], None]): Called with progress text.
+        priority (int): Scheduling priority of the LLM calls.
+
+    Returns:
+        dict: The store key and language of the summary.
+    """
+    from src.llm_actions import stream_translated_summary, summarize_text
+    from src.pipeline import load_subtitles, output_keys
+
+    url = params["url"]
+    caption_language = params["caption_language"]
+    chosen_language = params.get("chosen_language", "")
+    caption_code = params.get("caption_code")
+    video_id = extract_video_id(url)
+
+    report("Fetching subtitles")
+    _, subtitles_text, _ = load_subtitles(url, caption_language)
+    summary_key = output_keys(subtitles_text, chosen_language, video_id, caption_language)["summary"]
+    store = get_result_store()
+    if params["action"] == TRANSLATE:
+        summary = store.get(params["summary_key"])
+        if summary is None:
+            raise RuntimeError("The summary to translate is no longer cached; please generate it again")
+        report("Translating the summary")
+        for _ in stream_translated_summary(summary, subtitles_text, chosen_language=chosen_language, gemini_key=gemini_key,
+                                           video_id=video_id, caption_language=caption_language, priority=priority,
+                                           caption_code=caption_code):
+            pass
+    else:
+        report("Re-generating the summary")
+        # Skip the cached summary so the user actually gets a new one; cached chunk
+        # notes of long transcripts are reused, so only the final pass runs again
+        summarize_text(subtitles_text, chosen_language=chosen_language, gemini_key=gemini_key, video_id=video_id,
+                       caption_language=caption_language, use_cache=False, priority=priority, caption_code=caption_code)
+    if not store.has(summary_key):
+        raise RuntimeError("The summary could not be saved; please try again")
+    return {"summary_key": summary_key, "summary_language": chosen_language}
+
+
+def run_job(params: dict, gemini_key: str, report: Callable[[str], None], emit: Optional[Callable[[Dict[str, str]], None]] = None,
+            priority: int = INTERACTIVE) -> dict:
+    """
+    Runs the pipeline of one job: subtitles, summary and transcript, translations and chapter summaries.
+
+    Summary jobs (see `run_summary_job`) are run instead when the job has an "action".
+
+    The generated texts are stored in the result store; the returned result holds their keys.
+
+    Args:
+        params (dict): The job settings (see `JobQueue.submit`).
+        gemini_key (str): Gemini API key.
+        report (Callable[[str], None]): Called with progress text.
+        emit (Optional[Callable[[Dict[str, str]], None]]): Called with the new text of the summary and
+            the full transcript, by output name, every JOB_STREAM_SECONDS while they are written.
+        priority (int): Scheduling priority of the LLM calls.
+
+    Returns:
+        dict: The store keys of the outputs, the caption track used, the estimate made before
+        generation and the chapter summaries.
+    """
+    if params.get("action", PROCESS) != PROCESS:
+        return run_summary_job(params, gemini_key, report, priority)
+
+    from src.llm_actions import plan_request, summarize_chapters, summarize_languages
+    from src.media_processing import find_captions, get_video_chapters, get_video_info, retrieve_segments
+    from src.pipeline import iter_llm_stream, load_subtitles, output_keys
+    from src.segments import group_by_chapters, group_by_window
+
+    url = params["url"]
+    caption_language = params["caption_language"]
+    chosen_language = params.get("chosen_language", "")
+    video_id = extract_video_id(url)
+
+    report("Fetching subtitles")
+    title = get_video_info(url)["title"]
+    caption_code = next((code for code, name in find_captions(url).items() if name == caption_language), None)
+    subtitles_key, subtitles_text, compaction = load_subtitles(url, caption_language)
+
+    # Expected cost and latency, reported before any generation starts; both outputs run concurrently
+    plans = [plan_request("summary", subtitles_text), plan_request("full_transcript", subtitles_text)]
+    for plan in plans:
+        print(f"Plan: {plan.describe()}")
+    estimate = {
+        "tokens": sum(plan.tokens for plan in plans),
+        "cost": sum(plan.cost for plan in plans),
+        "latency": max(plan.latency for plan in plans),
+    }
+    writing = f"Writing the summary and the full transcript (estimated ~${estimate['cost']:.4f}, ~{estimate['latency']:.0f} s)"
+    report(writing)
+    texts = {"summary": "", "full_transcript": ""}
+    pending = {"summary": [], "full_transcript": []}
+    last_emit = last_report = 0.0
+    for name, piece in iter_llm_stream(subtitles_text, chosen_language=chosen_language, gemini_key=gemini_key,
+                                       video_id=video_id, caption_language=caption_language, caption_code=caption_code):
+        texts[name] += piece
+        pending[name].append(piece)
+        now = time.monotonic()
+        if emit is not None and now - last_emit >= JOB_STREAM_SECONDS:
+            last_emit = now
+            emit({output: "".join(pieces) for output, pieces in pending.items()})
+            pending = {output: [] for output in pending}
+        if now - last_report >= JOB_POLL_SECONDS:
+            last_report = now
+            report(f"{writing}: {len(texts['full_transcript']):,} characters formatted")
+    if emit is not None:
+        emit({output: "".join(pieces) for output, pieces in pending.items()})
+
+    keys = output_keys(subtitles_text, chosen_language, video_id, caption_language)
+    # The outputs are only saved when complete, e.g. not with transcript segments left unformatted
+    # after an error; the job fails rather than pointing at texts nobody can load
+    store = get_result_store()
+    if not store.has(keys["summary"]):
+        raise RuntimeError("The summary could not be saved; please try again")
+    if not store.has(keys["full_transcript"]):
+        raise RuntimeError("The full transcript could not be formatted completely; please try again")
+
+    result = {
+        "title": title,
+        "caption_language": caption_language,
+        "caption_code": caption_code,
+        "compaction": compaction,
+        "estimate": estimate,
+        "subtitles_key": subtitles_key,
+        "summary_key": keys["summary"],
+        "transcript_key": keys["full_transcript"],
+        "summary_language": chosen_language,
+        "translation_keys": None,
+        "chapter_summaries": None,
+    }
+
+    extra_languages = [language for language in dict.fromkeys(params.get("extra_languages", [])) if language != chosen_language]
+    if extra_languages:
+        report(f"Translating the summary into {len(extra_languages)} languages")
+        summarize_languages(subtitles_text, extra_languages, gemini_key=gemini_key, video_id=video_id, caption_language=caption_language,
+                            canonical_language=chosen_language, summary_text=texts["summary"], priority=priority, caption_code=caption_code)
+        result["translation_keys"] = {
+            language: output_keys(subtitles_text, language, video_id, caption_language)["summary"] for language in extra_languages
+        }
+
+    if params.get("chapters"):
+        report("Summarizing chapters")
+        segments = retrieve_segments(url, caption_language)
+        chapters = group_by_chapters(segments, get_video_chapters(url)) or group_by_window(segments)
+        chapter_summaries = summarize_chapters(chapters, chosen_language=chosen_language, gemini_key=gemini_key, video_id=video_id,
+                                               caption_language=caption_language, priority=priority, caption_code=caption_code)
+        result["chapter_summaries"] = [
+            {"title": chapter.title, "start": chapter.start, "summary": summary}
+            for chapter, summary in zip(chapters, chapter_summaries)
+        ]
+    return result
+
+
+def work(queue: JobQueue, worker: str, stop: Optional[threading.Event] = None, poll_seconds: float = JOB_POLL_SECONDS) -> None:
+    """
+    Runs jobs from the queue until `stop` is set.
+
+    A heartbeat thread keeps the running job alive while long LLM calls are in progress. Transient
+    failures (rate limits, timeouts) put the job back in the queue until MAX_JOB_ATTEMPTS is reached.
+
+    Args:
+        queue (JobQueue): The job queue.
+        worker (str): Name of this worker, recorded on the jobs it runs.
+        stop (Optional[threading.Event]): Set to stop after the current job.
+        poll_seconds (float): Wait between checks of an empty queue.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        queue.requeue_stale()
+        job = queue.claim(worker)
+        if job is None:
+            stop.wait(poll_seconds)
+            continue
+
+        print(f"[{worker}] Running job {job['id']} for {job['params']['url']}")
+        finished = threading.Event()
+
+        def keep_alive(job_id=job["id"], finished=finished):
+            while not finished.wait(JOB_HEARTBEAT_SECONDS):
+                queue.heartbeat(job_id)
+
+        threading.Thread(target=keep_alive, name="job-heartbeat", daemon=True).start()
+        try:
+            result = run_job(job["params"], job["gemini_key"],
+                             lambda progress, job_id=job["id"]: queue.heartbeat(job_id, progress),
+                             lambda pieces, job_id=job["id"]: queue.append_output(job_id, worker, pieces))
+        except Exception as e:
+            print(f"[{worker}] Job {job['id']} failed: {e}")
+            queue.fail(job["id"], str(e), retry=is_transient(e))
+        else:
+            queue.complete(job["id"], result)
+            print(f"[{worker}] Job {job['id']} done")
+        finally:
+            finished.set()
+            metrics.flush()
+
+
+def _worker_process(path: str, worker: str, budget_shares: int) -> None:
+    share_budget(budget_shares)
+    os.makedirs(JOB_METRICS_DIR, exist_ok=True)
+    metrics.export_state(os.path.join(JOB_METRICS_DIR, f"{worker}.json"))
+    work(JobQueue(path), worker)
+
+
+_workers: List[multiprocessing.Process] = []
+_workers_lock = threading.Lock()
+
+
+def start_workers(count: int = JOB_WORKERS, path: str = JOBS_PATH, budget_shares: Optional[int] = None) -> List[multiprocessing.Process]:
+    """
+    Starts `count` worker processes on the queue at `path`; later calls in the same process do nothing.
+
+    Workers are spawned rather than forked, so they never inherit the caller's threads. Each worker
+    gets 1/`budget_shares` of the GEMINI_RPM and GEMINI_TPM budgets and exports its metrics to
+    JOB_METRICS_DIR.
+
+    Args:
+        count (int): Number of worker processes.
+        path (str): Path of the job queue.
+        budget_shares (Optional[int]): Number of processes sharing the Gemini quota. Defaults to `count`;
+            pass the total when workers also run elsewhere with the same keys.
+
+    Returns:
+        List[multiprocessing.Process]: The worker processes.
+    """
+    with _workers_lock:
+        if not _workers:
+            context = multiprocessing.get_context("spawn")
+            for i in range(count):
+                process = context.Process(target=_worker_process, args=(path, f"worker-{os.getpid()}-{i}", budget_shares or count),
+                                          daemon=True)
+                process.start()
+                _workers.append(process)
+        return list(_workers)
@@ -1,30 +1,214 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langdetect import detect
-from typing import Literal
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
+from typing import TYPE_CHECKING, Dict, Iterator, List, Literal, Optional, Tuple
 
-def detect_language(text: str) -> str:
+from src.cache import TTLCache
+from src.metrics import metrics, track_stage
+from src.rate_limiter import INTERACTIVE, get_scheduler, is_transient
+from src.result_store import get_result_store, make_key, text_digest
+from src.search_index import index_in_background
+from src.segments import Chapter
+from src.text_processing import SegmentStitcher, estimate_tokens, split_captions, split_windows
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+# LangChain, Google GenAI and langdetect are heavy to import; they are loaded on first use
+# by _load_langchain and _load_langdetect, keeping app start-up and Streamlit reruns fast
+ChatPromptTemplate = None
+ChatGoogleGenerativeAI = None
+detect = None
+_import_lock = threading.Lock()
+
+GEMINI_MODEL = "gemini-2.0-flash-001"
+# Cheaper, faster tier used for short inputs
+GEMINI_LITE_MODEL = "gemini-2.0-flash-lite-001"
+
+# Language detection votes over a few evenly spaced windows instead of reading the whole transcript
+LANGUAGE_SAMPLE_WINDOWS = 5
+LANGUAGE_SAMPLE_CHARS = 1000
+# langdetect loads its profiles on first use and is not safe to initialize from several threads
+_langdetect_lock = threading.Lock()
+_detected_languages = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+# Transcripts estimated above this many tokens are summarized chunk by chunk (map-reduce)
+SINGLE_CALL_MAX_TOKENS = 24000
+# Estimated token budget of a single chunk in chunked mode
+CHUNK_TOKEN_BUDGET = 8000
+# Maximum number of LLM calls running at once for one request
+MAX_CONCURRENT_CALLS = 4
+# Transcripts estimated above this many tokens are formatted in overlapping segments,
+# keeping each call's output well under the model's output-token cap
+SINGLE_FORMAT_MAX_TOKENS = 6000
+# Estimated token budget of a segment, and of the overlap shared with the previous one
+SEGMENT_TOKEN_BUDGET = 3000
+SEGMENT_OVERLAP_TOKENS = 150
+# Inputs estimated at or below this many tokens (a clip of about 20 minutes) take the lite model
+FAST_PATH_MAX_TOKENS = 4000
+# Expected output of a summary call and of the notes on one chunk, used for planning
+SUMMARY_OUTPUT_TOKENS = 1000
+CHUNK_NOTE_TOKENS = 500
+# Estimated tokens (input and output, all calls) one summary or transcript request may spend
+REQUEST_TOKEN_BUDGET = int(os.environ.get("REQUEST_TOKEN_BUDGET", 1_000_000))
+
+# Clients are reused across calls and sessions, keyed by (model, hashed API key),
+# so their HTTP connections stay warm
+_llm_clients = TTLCache(maxsize=32, ttl=60 * 60)
+# Successful API key validations are remembered for this many seconds
+API_KEY_VALIDATION_TTL = 30 * 60
+_validated_keys = TTLCache(maxsize=256, ttl=API_KEY_VALIDATION_TTL)
+
+
+def _load_langchain() -> None:
+    global ChatPromptTemplate, ChatGoogleGenerativeAI
+    with _import_lock:
+        if ChatPromptTemplate is None:
+            from langchain_core.prompts import ChatPromptTemplate
+        if ChatGoogleGenerativeAI is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+def _load_langdetect() -> None:
+    global detect
+    with _import_lock:
+        if detect is None:
+            from langdetect import DetectorFactory, detect
+            # Seeded so the same text always gets the same answer
+            DetectorFactory.seed = 0
+
+
+def get_llm(gemini_key: str, model: str = GEMINI_MODEL) -> "ChatGoogleGenerativeAI":
+    """
+    Returns a shared Gemini chat client for the model and API key.
+
+    Args:
+        gemini_key (str): Gemini API key.
+        model (str): The Gemini model name. Defaults to GEMINI_MODEL.
+
+    Returns:
+        ChatGoogleGenerativeAI: The chat client.
+    """
+    key = (model, text_digest(gemini_key))
+    _load_langchain()
+    return _llm_clients.get_or_load(key, lambda: ChatGoogleGenerativeAI(model=model, google_api_key=gemini_key))
+
+
+def validate_api_key(gemini_key: str) -> bool:
+    """
+    Checks that the Gemini API key works, remembering successful checks for API_KEY_VALIDATION_TTL seconds.
+
+    The check counts the tokens of a short text, which is authenticated but does not run a generation.
+
+    Args:
+        gemini_key (str): Gemini API key.
+
+    Returns:
+        bool: True if the key is valid.
+    """
+    if not gemini_key:
+        return False
+    key = text_digest(gemini_key)
+    if _validated_keys.get(key):
+        return True
+    try:
+        get_llm(gemini_key).get_num_tokens("Test connection")
+    except Exception:
+        # Drop the client so a corrected key does not reuse a broken one
+        _llm_clients.pop((GEMINI_MODEL, key))
+        return False
+    _validated_keys.set(key, True)
+    return True
+
+
+def language_from_caption_code(caption_code: str) -> str:
+    """
+    Returns the language code of a YouTube caption track code, e.g. 'en' for 'a.en' (auto-generated English).
+
+    Args:
+        caption_code (str): The caption track code, as used as key in `find_captions`.
+
+    Returns:
+        str: The language code.
+    """
+    return caption_code.split(".")[-1]
+
+
+_WHITESPACE = re.compile(r"\s")
+_LAST_WHITESPACE = re.compile(r"\s(?!.*\s)", re.DOTALL)
+
+
+def _sample_windows(text: str, windows: int, size: int) -> List[str]:
+    if len(text) <= windows * size:
+        return [text]
+    step = (len(text) - size) / (windows - 1)
+    # Windows start and end on whitespace found within this distance of the raw offsets; text without
+    # spaces (Chinese, Japanese, Thai) is cut at the raw offsets
+    slack = size // 4
+    samples = []
+    for i in range(windows):
+        start = int(i * step)
+        if i:
+            boundary = _WHITESPACE.search(text, start, start + slack)
+            start = boundary.end() if boundary else start
+        end = start + size
+        boundary = _LAST_WHITESPACE.search(text, end - slack, end)
+        samples.append(text[start:boundary.start() if boundary else end])
+    return samples
+
+
+@track_stage("detect_language", text_arg="text")
+def detect_language(text: str, video_id: Optional[str] = None, caption_track: Optional[str] = None,
+                    caption_code: Optional[str] = None) -> str:
     """Detect the language of the input text.
 
+    The caption track's own language code is used when given. Otherwise a few evenly spaced windows
+    of the text are detected with a seeded detector and the majority wins. Results are cached
+    per video and caption track, or per text when no video ID is given.
+
     Args:
         text (str): The text to analyze for language detection.
+        video_id (Optional[str]): The YouTube video ID, used for the cache key.
+        caption_track (Optional[str]): The caption track the text was taken from, used for the cache key.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), used as a zero-cost shortcut.
 
     Returns:
-        str: The detected language code (e.g., 'en' for English).
+        str: The detected language code (e.g., 'en' for English), or "" if it could not be detected.
     """
-    try:
-        lang = detect(text)
-    except Exception as e:
-        lang = "English"
+    if caption_code:
+        return language_from_caption_code(caption_code)
+
+    key = (video_id, caption_track) if video_id else text_digest(text)
+    cached = _detected_languages.get(key)
+    if cached is not None:
+        return cached
+
+    _load_langdetect()
+    votes = Counter()
+    for sample in _sample_windows(text, LANGUAGE_SAMPLE_WINDOWS, LANGUAGE_SAMPLE_CHARS):
+        try:
+            with _langdetect_lock:
+                votes[detect(sample)] += 1
+        except Exception:
+            # Windows without letters (numbers, symbols) cannot be detected
+            continue
+    lang = votes.most_common(1)[0][0] if votes else ""
+    if lang:
+        _detected_languages.set(key, lang)
     return lang
     
-def create_prompt(type: Literal["summary", "full_transcript"] = 'summary') -> str:
+
+def create_prompt(type: Literal["summary", "full_transcript", "chunk_summary", "reduce_summary", "chapter_summary", "translate_summary"] = 'summary') -> str:
     """
     Build a structured prompt for a task.
 
     Args:
-        type (Literal["summary", "full_transcript"], optional): The type of prompt to create. Defaults to 'summary'.
+        type (Literal["summary", "full_transcript", "chunk_summary", "reduce_summary", "chapter_summary", "translate_summary"], optional): The type of prompt to create. Defaults to 'summary'.
 
     Returns:
         str: The constructed prompt string.
@@ -57,72 +241,753 @@ def create_prompt(type: Literal["summary", "full_transcript"] = 'summary') -> st
                 {input_text}
                 Output:
                 Return the cleaned and formatted text in its original language, without additional commentary.""")
+    elif type == 'chunk_summary':
+        prompt = """
+            Act as an expert editor. You are given one consecutive part of a longer video transcript.
+            The transcript is in {detected_language}; write your notes in the same language as the transcript.
+            Instructions:
+
+            * Extract the main ideas, events, arguments and notable facts of this part, in the order they appear.
+            * Preserve names, numbers and specific terms exactly.
+            * Omit filler words, repetitions and irrelevant details.
+            * Write concise bullet points only, without an introduction or conclusion.
+
+            Transcript part:
+            {input_text}
+            """
+    elif type == 'reduce_summary':
+        prompt = """
+            Act as an expert editor and writer specializing in content optimization. You are given notes on consecutive parts of a video transcript, in order.
+            Combine them into one well-structured text. The original transcript is in {detected_language}; the output text should be written in {chosen_language}.
+            Instructions:
+
+            * Identify Key Points: Merge the notes into the main ideas, events, or arguments of the whole video.
+            * Preserve Context: Maintain the original meaning and the order of the discussion.
+            * Keep it Coherent: Ensure the summary flows naturally and is easy to understand, without referring to "parts".
+            * Omit Redundancies: Remove points repeated across parts. Keep it concise.
+            * Use a Clear Structure: If possible, summarize in bullet points or short paragraphs for clarity. Use bold text or italics to highlight important concepts or words.
+
+            Notes:
+            {input_text}
+            """
+    elif type == 'chapter_summary':
+        prompt = """
+            Act as an expert editor. You are given the transcript of one chapter of a video, titled "{chapter_title}".
+            The transcript is in {detected_language}; the output text should be written in {chosen_language}.
+            Instructions:
+
+            * Summarize the chapter in 2 to 5 short bullet points covering its key points.
+            * Preserve names, numbers and specific terms exactly.
+            * Do not add an introduction, a conclusion or the chapter title.
+
+            Chapter transcript:
+            {input_text}
+            """
+    elif type == 'translate_summary':
+        prompt = """
+            Act as an expert translator. You are given the summary of a video.
+            Translate it into {chosen_language}.
+            Instructions:
+
+            * Keep the structure, bullet points and emphasis (bold, italics) exactly as they are.
+            * Preserve names, numbers and specific terms; keep established terms untranslated where that is usual.
+            * Return only the translated summary, without additional commentary.
+
+            Summary:
+            {input_text}
+            """
 
     return prompt
 
 
-def summarize_text(input_text: str, chosen_language: str, gemini_key:str) -> str:
+class ModelTier:
     """
-    Summarizes the given text using Gemini API.
+    A Gemini model with the limits and prices used to plan requests.
+
+    Attributes:
+        name (str): The model name.
+        context_tokens (int): The context window, input and output together.
+        output_tokens (int): The maximum output of one call.
+        input_price (float): USD per million input tokens.
+        output_price (float): USD per million output tokens.
+        latency (float): Typical time to first token in seconds.
+        tokens_per_second (float): Typical output throughput.
+    """
+
+    __slots__ = ("name", "context_tokens", "output_tokens", "input_price", "output_price", "latency", "tokens_per_second")
+
+    def __init__(self, name: str, context_tokens: int, output_tokens: int, input_price: float, output_price: float,
+                 latency: float, tokens_per_second: float):
+        self.name = name
+        self.context_tokens = context_tokens
+        self.output_tokens = output_tokens
+        self.input_price = input_price
+        self.output_price = output_price
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+    def fits(self, input_tokens: int, output_tokens: int) -> bool:
+        """Return True if one call with this input and output stays within the model's limits."""
+        return output_tokens <= self.output_tokens and input_tokens + output_tokens <= self.context_tokens
+
+
+MODEL_TIERS = {
+    GEMINI_LITE_MODEL: ModelTier(GEMINI_LITE_MODEL, 1_048_576, 8192, 0.075, 0.30, latency=0.4, tokens_per_second=250),
+    GEMINI_MODEL: ModelTier(GEMINI_MODEL, 1_048_576, 8192, 0.10, 0.40, latency=0.6, tokens_per_second=200),
+}
+
+
+def select_tier(input_tokens: int) -> ModelTier:
+    """Return the model tier for an input of the given estimated size: lite for short clips, flash otherwise."""
+    return MODEL_TIERS[GEMINI_LITE_MODEL if input_tokens <= FAST_PATH_MAX_TOKENS else GEMINI_MODEL]
+
+
+class RequestPlan:
+    """
+    The model, strategy and expected size, cost and latency of a summary or transcript request.
+
+    Attributes:
+        task (str): "summary" or "full_transcript".
+        model (str): The model name.
+        mode (str): "single", "chunked" (summary map-reduce) or "segmented" (transcript windows).
+        chunk_tokens (int): Estimated size of a chunk or window; the whole input in single mode.
+        calls (int): Number of LLM calls.
+        input_tokens (int): Estimated input tokens over all calls.
+        output_tokens (int): Estimated output tokens over all calls.
+        cost (float): Estimated cost in USD.
+        latency (float): Estimated duration in seconds.
+    """
+
+    __slots__ = ("task", "model", "mode", "chunk_tokens", "calls", "input_tokens", "output_tokens", "cost", "latency")
+
+    def __init__(self, task: str, model: str, mode: str, chunk_tokens: int, calls: int, input_tokens: int,
+                 output_tokens: int, cost: float, latency: float):
+        self.task = task
+        self.model = model
+        self.mode = mode
+        self.chunk_tokens = chunk_tokens
+        self.calls = calls
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cost = cost
+        self.latency = latency
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def describe(self) -> str:
+        return (f"{self.task}: {self.mode} on {self.model}, {self.calls} calls, ~{self.tokens:,} tokens, "
+                f"~${self.cost:.4f}, ~{self.latency:.0f} s")
+
+
+def plan_request(task: Literal["summary", "full_transcript"], input_text: str, mode: str = "auto", chunk_tokens: Optional[int] = None,
+                 max_concurrency: int = MAX_CONCURRENT_CALLS) -> RequestPlan:
+    """
+    Routes a request: picks the model tier and chunking strategy from the input size and the task.
+
+    Short inputs take the lite model in a single call. Summaries above SINGLE_CALL_MAX_TOKENS are
+    chunked (map-reduce) and transcripts above SINGLE_FORMAT_MAX_TOKENS are formatted in segments; a
+    requested single call that would not fit the model's limits is chunked as well, and chunks grow
+    when their notes would not fit the final call, so no call overflows the context window.
+
+    Args:
+        task (Literal["summary", "full_transcript"]): The task.
+        input_text (str): The subtitles text.
+        mode (str): "auto", or the strategy asked for by the caller ("single", "chunked" or "segmented").
+        chunk_tokens (Optional[int]): Estimated size of a chunk or window. Defaults to CHUNK_TOKEN_BUDGET
+            for summaries and SEGMENT_TOKEN_BUDGET for transcripts.
+        max_concurrency (int): Maximum number of calls running at once, used for the latency estimate.
+
+    Returns:
+        RequestPlan: The plan, with the expected tokens, cost and latency.
+    """
+    tokens = estimate_tokens(input_text)
+    tier = select_tier(tokens)
+    prompt_tokens = estimate_tokens(create_prompt(type=task))
+    # The input text is sent twice: in the system template and as the user message
+    sent = lambda size: prompt_tokens + 2 * size
+
+    if task == "summary":
+        split_mode = "chunked"
+        if mode == "auto":
+            mode = split_mode if tokens > SINGLE_CALL_MAX_TOKENS else "single"
+        chunk_tokens = chunk_tokens or CHUNK_TOKEN_BUDGET
+        single_output = SUMMARY_OUTPUT_TOKENS
+    else:
+        split_mode = "segmented"
+        if mode == "auto":
+            mode = split_mode if tokens > SINGLE_FORMAT_MAX_TOKENS else "single"
+        chunk_tokens = chunk_tokens or SEGMENT_TOKEN_BUDGET
+        # A formatted transcript is about as long as its input
+        single_output = tokens
+    if mode == "single" and not tier.fits(sent(tokens), single_output):
+        mode = split_mode
+
+    if mode == "single":
+        calls, input_tokens, output_tokens = 1, sent(tokens), single_output
+        latency = tier.latency + output_tokens / tier.tokens_per_second
+        chunk_tokens = tokens
+    elif task == "summary":
+        # The notes of every chunk are read by the final call, so they must fit its context window together
+        reduce_prompt = estimate_tokens(create_prompt(type="reduce_summary"))
+        max_chunks = max(1, (tier.context_tokens - SUMMARY_OUTPUT_TOKENS - reduce_prompt) // (2 * CHUNK_NOTE_TOKENS))
+        chunk_tokens = max(chunk_tokens, math.ceil(tokens / max_chunks))
+        chunks = max(1, math.ceil(tokens / chunk_tokens))
+        calls = chunks + 1
+        input_tokens = chunks * (estimate_tokens(create_prompt(type="chunk_summary")) + 2 * chunk_tokens) + reduce_prompt + 2 * chunks * CHUNK_NOTE_TOKENS
+        output_tokens = chunks * CHUNK_NOTE_TOKENS + SUMMARY_OUTPUT_TOKENS
+        latency = (math.ceil(chunks / max_concurrency) * (tier.latency + CHUNK_NOTE_TOKENS / tier.tokens_per_second)
+                   + tier.latency + SUMMARY_OUTPUT_TOKENS / tier.tokens_per_second)
+    else:
+        # Each window's formatted text must fit one call's output
+        chunk_tokens = min(chunk_tokens, tier.output_tokens // 2)
+        windows = max(1, math.ceil(tokens / chunk_tokens))
+        calls = windows
+        input_tokens = windows * sent(chunk_tokens + SEGMENT_OVERLAP_TOKENS)
+        output_tokens = windows * (chunk_tokens + SEGMENT_OVERLAP_TOKENS)
+        latency = math.ceil(windows / max_concurrency) * (tier.latency + (chunk_tokens + SEGMENT_OVERLAP_TOKENS) / tier.tokens_per_second)
+
+    cost = (input_tokens * tier.input_price + output_tokens * tier.output_price) / 1_000_000
+    return RequestPlan(task, tier.name, mode, chunk_tokens, calls, input_tokens, output_tokens, cost, latency)
+
+
+def check_budget(plan: RequestPlan, token_budget: int = REQUEST_TOKEN_BUDGET) -> None:
+    """Raise a RuntimeError if the plan is expected to spend more than `token_budget` tokens."""
+    if plan.tokens > token_budget:
+        print(f"Refusing {plan.describe()}: the token budget is {token_budget:,}")
+        raise RuntimeError(
+            f"The video is too long: about {plan.tokens:,} tokens, above the per-request budget of "
+            f"{token_budget:,} (REQUEST_TOKEN_BUDGET)"
+        )
+
+
+class ScheduledLLM:
+    """
+    A shared Gemini client whose calls go through the process-wide scheduler.
+
+    Every call waits for the API key's request and token budget, in priority order, and
+    transient failures are retried with backoff. The estimated tokens of all calls, retries
+    included, are counted against the request's own budget.
+
+    Args:
+        gemini_key (str): Gemini API key.
+        priority (int): INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        model (str): The Gemini model name. Defaults to GEMINI_MODEL.
+        token_budget (int): Estimated tokens the calls of this request may spend. Defaults to REQUEST_TOKEN_BUDGET.
+    """
+
+    __slots__ = ("llm", "key_id", "priority", "model", "token_budget", "spent", "_lock")
+
+    def __init__(self, gemini_key: str, priority: int = INTERACTIVE, model: str = GEMINI_MODEL, token_budget: int = REQUEST_TOKEN_BUDGET):
+        self.llm = get_llm(gemini_key, model)
+        self.key_id = text_digest(gemini_key)
+        self.priority = priority
+        self.model = model
+        self.token_budget = token_budget
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def _spend(self, tokens: int) -> None:
+        with self._lock:
+            if self.spent + tokens > self.token_budget:
+                raise RuntimeError(
+                    f"The request ran out of its token budget: {self.spent:,} of {self.token_budget:,} "
+                    f"tokens spent (REQUEST_TOKEN_BUDGET)"
+                )
+            self.spent += tokens
+
+    @staticmethod
+    def _prompt(system_template: str, variables: dict):
+        _load_langchain()
+        prompt_template = ChatPromptTemplate.from_messages(
+            [("system", system_template), ("user", "{input_text}")]
+        )
+        return prompt_template.invoke(variables)
+
+    @staticmethod
+    def _estimate(system_template: str, variables: dict) -> int:
+        # The input text is sent twice: in the system template and as the user message
+        return estimate_tokens(system_template) + sum(estimate_tokens(str(value)) for value in variables.values()) + estimate_tokens(variables.get("input_text", ""))
+
+    def invoke(self, system_template: str, variables: dict) -> str:
+        """Runs the prompt and returns the response text."""
+        prompt = self._prompt(system_template, variables)
+        tokens = self._estimate(system_template, variables)
+
+        def attempt() -> str:
+            # Charged on every attempt, so retries count against the budget like those of `stream`
+            self._spend(tokens)
+            response = self.llm.invoke(prompt).content
+            self._spend(estimate_tokens(response))
+            return response
+
+        return get_scheduler().call(self.key_id, attempt, tokens, self.priority)
+
+    def stream(self, system_template: str, variables: dict) -> Iterator[str]:
+        """Runs the prompt and yields the response text as it is generated."""
+        prompt = self._prompt(system_template, variables)
+        tokens = self._estimate(system_template, variables)
+        scheduler = get_scheduler()
+        for attempt in range(scheduler.max_retries + 1):
+            self._spend(tokens)
+            scheduler.acquire(self.key_id, tokens, self.priority)
+            started = False
+            try:
+                for chunk in self.llm.stream(prompt):
+                    if chunk.content:
+                        started = True
+                        self._spend(estimate_tokens(chunk.content))
+                        yield chunk.content
+            except Exception as e:
+                scheduler.report(self.key_id, e)
+                # A stream can only be retried before any of its output was handed out
+                if started or attempt == scheduler.max_retries or not is_transient(e):
+                    raise
+                time.sleep(scheduler.retry_delay(attempt))
+            else:
+                scheduler.report(self.key_id)
+                return
+
+
+def _stream_chunked_summary(llm: ScheduledLLM, chunks: List[str], detected_language: str, chosen_language: str, max_concurrency: int) -> Iterator[str]:
+    store = get_result_store()
+    chunk_template = create_prompt(type='chunk_summary')
+    languages = {"detected_language": detected_language, "chosen_language": chosen_language}
+
+    def summarize_chunk(chunk: str) -> str:
+        # Notes are kept in the transcript's language and checkpointed by content, so a retry after a failure
+        # resumes from the missing chunks, and re-generating the summary or asking for another output
+        # language only repeats the reduce pass
+        cache_key = make_key(task="chunk_summary", chunk=text_digest(chunk), detected_language=detected_language,
+                             model=llm.model, prompt=text_digest(chunk_template))
+        cached = store.get(cache_key)
+        metrics.record_cache("chunk_summary", cached is not None)
+        if cached is not None:
+            return cached
+        partial = llm.invoke(chunk_template, {"detected_language": detected_language, "input_text": chunk})
+        store.put(cache_key, partial)
+        return partial
+
+    # Map: summarize every chunk independently, a bounded number at a time
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        partials = list(executor.map(summarize_chunk, chunks))
+
+    # Reduce: merge the ordered partial summaries into the final structured summary
+    notes = "\n\n".join(f"Part {i}:\n{partial}" for i, partial in enumerate(partials, start=1))
+    yield from llm.stream(create_prompt(type='reduce_summary'), {**languages, "input_text": notes})
+
+
+# Every prompt whose output ends up under a task's result key: long summaries are map-reduced from
+# chunk notes, and translated summaries are stored under the summary key of their language
+_TASK_PROMPTS = {
+    "summary": ("summary", "chunk_summary", "reduce_summary", "translate_summary"),
+    "full_transcript": ("full_transcript",),
+}
+
+
+def result_key(task: str, input_text: str, video_id: Optional[str] = None, caption_language: Optional[str] = None, chosen_language: str = "") -> str:
+    """
+    Build the result cache key of an LLM task.
+
+    Args:
+        task (str): The prompt type ("summary" or "full_transcript").
+        input_text (str): The subtitles text, used as the source identity when no video ID is given.
+        video_id (Optional[str]): The YouTube video ID.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        chosen_language (str): The requested output language ("" for the original language).
+
+    Returns:
+        str: The cache key.
+    """
+    return make_key(
+        task=task,
+        source=video_id or text_digest(input_text),
+        caption_language=caption_language,
+        chosen_language=chosen_language,
+        model=select_tier(estimate_tokens(input_text)).name,
+        prompt=text_digest("\n".join(create_prompt(type=prompt) for prompt in _TASK_PROMPTS.get(task, (task,)))),
+    )
+
+
+@track_stage("summarize_text", text_arg="input_text")
+def stream_summary(input_text: str, chosen_language: str, gemini_key:str, video_id: Optional[str] = None, caption_language: Optional[str] = None, use_cache: bool = True,
+                   mode: Literal["auto", "single", "chunked"] = "auto", chunk_tokens: int = CHUNK_TOKEN_BUDGET, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                   detected_language: Optional[str] = None, priority: int = INTERACTIVE, caption_code: Optional[str] = None,
+                   token_budget: int = REQUEST_TOKEN_BUDGET) -> Iterator[str]:
+    """
+    Summarizes the given text using Gemini API, yielding the summary as it is generated.
+
+    Results are cached on disk, so repeated requests for the same video and settings skip the LLM call.
+    The model and strategy are routed by `plan_request`: long transcripts are split on caption boundaries,
+    the chunks are summarized in parallel and the partial summaries are merged in a final, streamed call.
 
     Args:
         input_text (str): The text to summarize.
         chosen_language (str): The language in which the summary should be written.
         gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the cache key.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        use_cache (bool): Whether to return a cached summary if one exists. Defaults to True.
+        mode (Literal["auto", "single", "chunked"]): "single" sends the whole text in one call, "chunked" uses map-reduce,
+            "auto" picks chunked mode for texts above SINGLE_CALL_MAX_TOKENS. Defaults to "auto".
+        chunk_tokens (int): Estimated token budget of a chunk in chunked mode; raised when the notes would not fit the final call.
+        max_concurrency (int): Maximum number of chunk calls running at once.
+        detected_language (Optional[str]): The language of the input text, if already known. Detected when omitted.
+        priority (int): Scheduling priority of the LLM calls, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+        token_budget (int): Estimated tokens the request may spend; larger plans are refused before any call.
 
-    Returns:
-        str: The generated summary.
+    Yields:
+        str: Consecutive pieces of the generated summary.
     """
+    store = get_result_store()
+    cache_key = result_key("summary", input_text, video_id, caption_language, chosen_language)
+    if use_cache:
+        cached = store.get(cache_key)
+        metrics.record_cache("summary", cached is not None)
+        if cached is not None:
+            print("Summary found in cache")
+            yield cached
+            return
+
     system_template = create_prompt()
 
     # Detect the language of the input text
-    detected_language = detect_language(input_text)
+    if not detected_language:
+        detected_language = detect_language(input_text, video_id, caption_language, caption_code)
     # Set chosen language to detected if selected to work with original language
     if chosen_language == "":
-        chosen_language = detected_language
+        chosen_language = detected_language or "the same language as the transcript"
+    if not detected_language:
+        detected_language = "an undetermined language"
+
+    plan = plan_request("summary", input_text, mode, chunk_tokens, max_concurrency)
+    print(f"Plan: {plan.describe()}")
+    check_budget(plan, token_budget)
 
     try:
         print(f"Summarizing text in {chosen_language}..")
-        prompt_template = ChatPromptTemplate.from_messages(
-            [("system", system_template), ("user", "{input_text}")]
-        )
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-001", google_api_key=gemini_key)
+        llm = ScheduledLLM(gemini_key, priority, plan.model, token_budget)
 
-        prompt = prompt_template.invoke({"detected_language": detected_language, "chosen_language": chosen_language, "input_text": input_text})
+        chunks = split_captions(input_text, plan.chunk_tokens) if plan.mode == "chunked" else [input_text]
+        if len(chunks) > 1:
+            print(f"Summarizing {len(chunks)} chunks..")
+            pieces = _stream_chunked_summary(llm, chunks, detected_language, chosen_language, max_concurrency)
+        else:
+            pieces = llm.stream(system_template, {"detected_language": detected_language, "chosen_language": chosen_language, "input_text": input_text})
+
+        summary = []
+        for piece in pieces:
+            summary.append(piece)
+            yield piece
 
-        response = llm.invoke(prompt)
         print(f"Summarization complete!")
-        return response.content
+        store.put(cache_key, "".join(summary))
 
     except Exception as e:
         raise RuntimeError(f"Error during summarization: {str(e)}")
 
 
-def get_full_transcription(input_text: str, gemini_key:str) -> str:
+def summarize_text(input_text: str, chosen_language: str, gemini_key:str, video_id: Optional[str] = None, caption_language: Optional[str] = None, use_cache: bool = True,
+                   mode: Literal["auto", "single", "chunked"] = "auto", chunk_tokens: int = CHUNK_TOKEN_BUDGET, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                   detected_language: Optional[str] = None, priority: int = INTERACTIVE, caption_code: Optional[str] = None,
+                   token_budget: int = REQUEST_TOKEN_BUDGET) -> str:
     """
-    Creates a full, well-formatted transcription of the input text.
+    Summarizes the given text using Gemini API.
+
+    Takes the same arguments as `stream_summary` and returns the complete summary.
+
+    Returns:
+        str: The generated summary.
+    """
+    return "".join(stream_summary(input_text, chosen_language, gemini_key, video_id, caption_language, use_cache,
+                                  mode, chunk_tokens, max_concurrency, detected_language, priority, caption_code, token_budget))
+
+
+@track_stage("translate_summary", text_arg="summary_text")
+def stream_translated_summary(summary_text: str, input_text: str, chosen_language: str, gemini_key: str, video_id: Optional[str] = None,
+                              caption_language: Optional[str] = None, use_cache: bool = True, priority: int = INTERACTIVE,
+                              caption_code: Optional[str] = None) -> Iterator[str]:
+    """
+    Produces the summary in another language by translating an existing summary, yielding it as it is generated.
+
+    Only the summary is sent to the model, not the transcript. The result is cached under the same key
+    as a summary written directly in `chosen_language`, and such a summary is returned if it already exists.
 
     Args:
-        input_text (str): The raw transcription text to format.
+        summary_text (str): The existing summary.
+        input_text (str): The subtitles text the summary was made from, used for the cache key and language detection.
+        chosen_language (str): The language to translate into ("" for the original language of the transcript).
         gemini_key (str): Gemini API key.
-        
+        video_id (Optional[str]): The YouTube video ID, used for the cache key.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        use_cache (bool): Whether to return a cached summary in `chosen_language` if one exists. Defaults to True.
+        priority (int): Scheduling priority of the LLM call, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
+    Yields:
+        str: Consecutive pieces of the translated summary.
+    """
+    store = get_result_store()
+    cache_key = result_key("summary", input_text, video_id, caption_language, chosen_language)
+    if use_cache:
+        cached = store.get(cache_key)
+        metrics.record_cache("summary", cached is not None)
+        if cached is not None:
+            print("Summary found in cache")
+            yield cached
+            return
+
+    if chosen_language == "":
+        chosen_language = detect_language(input_text, video_id, caption_language, caption_code) or "the same language as the transcript"
+
+    try:
+        print(f"Translating summary to {chosen_language}..")
+        # Only the summary is sent, so translations take the tier of a short input
+        llm = ScheduledLLM(gemini_key, priority, select_tier(estimate_tokens(summary_text)).name)
+        translation = []
+        for piece in llm.stream(create_prompt(type='translate_summary'), {"chosen_language": chosen_language, "input_text": summary_text}):
+            translation.append(piece)
+            yield piece
+
+        print(f"Translation complete!")
+        store.put(cache_key, "".join(translation))
+
+    except Exception as e:
+        raise RuntimeError(f"Error during translation: {str(e)}")
+
+
+@track_stage("summarize_languages", text_arg="input_text")
+def summarize_languages(input_text: str, languages: List[str], gemini_key: str, video_id: Optional[str] = None, caption_language: Optional[str] = None,
+                        canonical_language: str = "", summary_text: Optional[str] = None, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                        priority: int = INTERACTIVE, caption_code: Optional[str] = None) -> Dict[str, str]:
+    """
+    Summarizes the text once and translates that summary into any number of languages concurrently.
+
+    Only the canonical summary reads the whole transcript; every other language is a short translation
+    call on the summary, cached on its own by `stream_translated_summary`.
+
+    Args:
+        input_text (str): The text to summarize.
+        languages (List[str]): The output languages ("" for the original language of the transcript).
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the cache keys.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        canonical_language (str): The language of the canonical summary ("" for the original language). Defaults to "".
+        summary_text (Optional[str]): The canonical summary, if already made. Created when omitted.
+        max_concurrency (int): Maximum number of translation calls running at once.
+        priority (int): Scheduling priority of the LLM calls, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
     Returns:
-        str: The cleaned and formatted transcription.
+        Dict[str, str]: The summary in each language, in the order of `languages`.
     """
+    if summary_text is None:
+        summary_text = summarize_text(input_text, canonical_language, gemini_key, video_id, caption_language,
+                                      priority=priority, caption_code=caption_code)
+    targets = list(dict.fromkeys(languages))
+
+    def translate(language: str) -> str:
+        if language == canonical_language:
+            return summary_text
+        return "".join(stream_translated_summary(summary_text, input_text, language, gemini_key, video_id, caption_language,
+                                                 priority=priority, caption_code=caption_code))
+
+    print(f"Translating the summary into {len(targets)} languages..")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(targets)))) as executor:
+        return dict(zip(targets, executor.map(translate, targets)))
+
+
+def _stream_segments(llm: ScheduledLLM, windows: List[str], max_concurrency: int, status: dict) -> Iterator[str]:
+    store = get_result_store()
     system_template = create_prompt(type='full_transcript')
 
+    def format_window(window: str) -> Tuple[str, bool]:
+        # Each formatted window is checkpointed, so a retry after a failure only formats the missing ones
+        cache_key = make_key(task="transcript_segment", window=text_digest(window), model=llm.model,
+                             prompt=text_digest(system_template))
+        cached = store.get(cache_key)
+        metrics.record_cache("transcript_segment", cached is not None)
+        if cached is not None:
+            return cached, True
+        try:
+            formatted = llm.invoke(system_template, {"input_text": window})
+        except Exception as e:
+            if not is_transient(e):
+                # An invalid key, a budget refusal or a bug fails the transcript instead of hiding in it
+                raise
+            # Keep the job alive: this window stays unformatted rather than losing the whole transcript
+            print(f"Formatting a transcript segment failed after retries: {e}")
+            return window, False
+        store.put(cache_key, formatted)
+        return formatted, True
+
+    # Segments are formatted concurrently but stitched and handed out in order
+    stitcher = SegmentStitcher()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(format_window, window) for window in windows]
+        try:
+            for future in futures:
+                text, ok = future.result()
+                status["complete"] = status["complete"] and ok
+                yield stitcher.add(text)
+        finally:
+            # On an error (or an abandoned stream) the windows not started yet are skipped
+            for future in futures:
+                future.cancel()
+
+
+@track_stage("get_full_transcription", text_arg="input_text")
+def stream_full_transcription(input_text: str, gemini_key:str, video_id: Optional[str] = None, caption_language: Optional[str] = None, use_cache: bool = True,
+                              mode: Literal["auto", "single", "segmented"] = "auto", segment_tokens: int = SEGMENT_TOKEN_BUDGET,
+                              overlap_tokens: int = SEGMENT_OVERLAP_TOKENS, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                              priority: int = INTERACTIVE, token_budget: int = REQUEST_TOKEN_BUDGET) -> Iterator[str]:
+    """
+    Creates a full, well-formatted transcription of the input text, yielding it as it is generated.
+
+    The model and strategy are routed by `plan_request`: long transcripts are formatted as overlapping
+    windows in parallel, and the formatted windows are stitched back in order with the duplicated text
+    at the seams removed.
+
+    Args:
+        input_text (str): The raw transcription text to format.
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the cache key.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        use_cache (bool): Whether to return a cached transcript if one exists. Defaults to True.
+        mode (Literal["auto", "single", "segmented"]): "single" formats the whole text in one call, "segmented" formats
+            windows concurrently, "auto" picks segmented mode for texts above SINGLE_FORMAT_MAX_TOKENS. Defaults to "auto".
+        segment_tokens (int): Estimated token budget of a window in segmented mode.
+        overlap_tokens (int): Estimated token budget of the overlap between consecutive windows.
+        max_concurrency (int): Maximum number of window calls running at once.
+        priority (int): Scheduling priority of the LLM calls, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        token_budget (int): Estimated tokens the request may spend; larger plans are refused before any call.
+
+    Yields:
+        str: Consecutive pieces of the formatted transcription.
+    """
+    store = get_result_store()
+    cache_key = result_key("full_transcript", input_text, video_id, caption_language)
+    if use_cache:
+        cached = store.get(cache_key)
+        metrics.record_cache("full_transcript", cached is not None)
+        if cached is not None:
+            print("Full transcript found in cache")
+            yield cached
+            return
+
+    plan = plan_request("full_transcript", input_text, mode, segment_tokens, max_concurrency)
+    print(f"Plan: {plan.describe()}")
+    check_budget(plan, token_budget)
+
     try:
         print(f"Creating full transcript..")
-        prompt_template = ChatPromptTemplate.from_messages(
-            [("system", system_template), ("user", "{input_text}")]
-        )
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-001", google_api_key=gemini_key)
+        llm = ScheduledLLM(gemini_key, priority, plan.model, token_budget)
+
+        status = {"complete": True}
+        windows = split_windows(input_text, plan.chunk_tokens, overlap_tokens) if plan.mode == "segmented" else [input_text]
+        if len(windows) > 1:
+            print(f"Formatting {len(windows)} segments..")
+            pieces = _stream_segments(llm, windows, max_concurrency, status)
+        else:
+            pieces = llm.stream(create_prompt(type='full_transcript'), {"input_text": input_text})
 
-        prompt = prompt_template.invoke({"input_text": input_text})
-        response = llm.invoke(prompt)
+        full_transcript = []
+        for piece in pieces:
+            full_transcript.append(piece)
+            yield piece
 
         print(f"Full transcript created!")
-        return response.content
+        # Do not cache a transcript with unformatted segments, so a later request can fix it
+        if status["complete"]:
+            text = "".join(full_transcript)
+            store.put(cache_key, text)
+            if video_id:
+                # Make the formatted transcript searchable across processed videos
+                index_in_background(lambda index: index.add_transcript(video_id, caption_language, text))
 
     except Exception as e:
         raise RuntimeError(f"Error during creating full transcript: {str(e)}")
+
+
+def get_full_transcription(input_text: str, gemini_key:str, video_id: Optional[str] = None, caption_language: Optional[str] = None, use_cache: bool = True,
+                           mode: Literal["auto", "single", "segmented"] = "auto", segment_tokens: int = SEGMENT_TOKEN_BUDGET,
+                           overlap_tokens: int = SEGMENT_OVERLAP_TOKENS, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                           priority: int = INTERACTIVE, token_budget: int = REQUEST_TOKEN_BUDGET) -> str:
+    """
+    Creates a full, well-formatted transcription of the input text.
+
+    Takes the same arguments as `stream_full_transcription` and returns the complete transcription.
+        
+    Returns:
+        str: The cleaned and formatted transcription.
+    """
+    return "".join(stream_full_transcription(input_text, gemini_key, video_id, caption_language, use_cache,
+                                             mode, segment_tokens, overlap_tokens, max_concurrency, priority, token_budget))
+
+
+@track_stage("summarize_chapters")
+def summarize_chapters(chapters: List[Chapter], chosen_language: str, gemini_key: str, video_id: Optional[str] = None,
+                       caption_language: Optional[str] = None, max_concurrency: int = MAX_CONCURRENT_CALLS,
+                       priority: int = INTERACTIVE, caption_code: Optional[str] = None) -> List[str]:
+    """
+    Summarizes every chapter independently and in parallel.
+
+    Each chapter summary is cached on its own, keyed by the chapter's time range and text.
+
+    Args:
+        chapters (List[Chapter]): The chapters to summarize.
+        chosen_language (str): The language in which the summaries should be written ("" for the original language).
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the cache key.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        max_concurrency (int): Maximum number of chapter calls running at once.
+        priority (int): Scheduling priority of the LLM calls, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
+    Returns:
+        List[str]: The chapter summaries, in the order of `chapters`.
+    """
+    if not chapters:
+        return []
+    store = get_result_store()
+    system_template = create_prompt(type='chapter_summary')
+    detected_language = detect_language("\n".join(chapter.text for chapter in chapters), video_id, caption_language, caption_code)
+    output_language = chosen_language or detected_language or "the same language as the transcript"
+    detected_language = detected_language or "an undetermined language"
+
+    def summarize_chapter(chapter: Chapter) -> str:
+        cache_key = make_key(
+            task="chapter_summary",
+            source=video_id or text_digest(chapter.text),
+            caption_language=caption_language,
+            chosen_language=chosen_language,
+            chapter=[chapter.start, chapter.end, text_digest(chapter.text)],
+            model=llm.model,
+            prompt=text_digest(system_template),
+        )
+        cached = store.get(cache_key)
+        metrics.record_cache("chapter_summary", cached is not None)
+        if cached is not None:
+            return cached
+        summary = llm.invoke(system_template, {
+            "chapter_title": chapter.title,
+            "detected_language": detected_language,
+            "chosen_language": output_language,
+            "input_text": chapter.text,
+        })
+        store.put(cache_key, summary)
+        return summary
+
+    try:
+        print(f"Summarizing {len(chapters)} chapters..")
+        # Chapters are short; the longest one picks the tier
+        llm = ScheduledLLM(gemini_key, priority, select_tier(max(estimate_tokens(chapter.text) for chapter in chapters)).name)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            summaries = list(executor.map(summarize_chapter, chapters))
+        print(f"Chapter summaries complete!")
+        return summaries
+
+    except Exception as e:
+        raise RuntimeError(f"Error during chapter summarization: {str(e)}")
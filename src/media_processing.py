@@ -1,15 +1,29 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+import threading
 import time
 import ssl
 import certifi
 import urllib3
 
-from pytubefix.cli import on_progress
-from pytubefix import YouTube
+from src.cache import TTLCache
+from src.metrics import metrics, track_stage
+from src.search_index import SearchIndex, index_in_background
+from src.segments import CaptionSegments
+from src.utils import extract_video_id
 
 # Disable SSL warnings for development/local issues
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# pytubefix is imported on first fetch (see _load_pytubefix) to keep app start-up fast
+YouTube = None
+on_progress = None
+_import_lock = threading.Lock()
+
+# Video handles shared by every session in the process, keyed by video ID
+VIDEO_CACHE_SIZE = 256
+VIDEO_CACHE_TTL = 15 * 60
+_video_cache = TTLCache(maxsize=VIDEO_CACHE_SIZE, ttl=VIDEO_CACHE_TTL)
+
 def create_ssl_context():
     """Create SSL context with proper certificate verification."""
     try:
@@ -20,6 +34,94 @@ def create_ssl_context():
         # Fallback to default context
         return ssl.create_default_context()
 
+class VideoHandle:
+    """
+    Metadata and caption tracks of a YouTube video, fetched once and shared.
+
+    Attributes:
+        video_id (str): The 11-character video ID.
+        title (str): The video title.
+        length (int): The video length in seconds.
+        captions (Dict[str, str]): Caption language codes mapped to their display names.
+        caption_tracks: The pytubefix caption query holding the caption tracks.
+        chapters (List[Tuple[str, float]]): The video's own chapter titles and start times in seconds.
+    """
+
+    def __init__(self, video_id, title, length, captions, caption_tracks, chapters):
+        self.video_id = video_id
+        self.title = title
+        self.length = length
+        self.captions = captions
+        self.caption_tracks = caption_tracks
+        self.chapters = chapters
+        self._segments = {}  # caption code -> CaptionSegments
+        self._segments_lock = threading.Lock()
+
+    def caption_segments(self, code: str) -> CaptionSegments:
+        """
+        Returns the timed segments of a caption track, downloading and parsing its json3 once.
+
+        Raises:
+            Exception: Whatever pytubefix raises when the track cannot be fetched; failures are not cached.
+        """
+        with self._segments_lock:
+            segments = self._segments.get(code)
+            if segments is None:
+                segments = self._segments[code] = CaptionSegments.from_json_captions(self.caption_tracks[code].json_captions)
+            return segments
+
+def _load_pytubefix() -> None:
+    global YouTube, on_progress
+    with _import_lock:
+        if YouTube is None:
+            from pytubefix import YouTube
+        if on_progress is None:
+            from pytubefix.cli import on_progress
+
+def _fetch_video_handle(url: str, video_id: str) -> VideoHandle:
+    _load_pytubefix()
+    # Configure SSL context globally for urllib
+    ssl_context = create_ssl_context()
+    # Apply SSL context to the default HTTPS context
+    ssl._create_default_https_context = lambda: ssl_context
+
+    yt = YouTube(url, on_progress_callback=on_progress, use_oauth=False, allow_oauth_cache=False)
+    # Resolve the lazy properties here so the network round trips happen only once
+    caption_tracks = yt.captions
+    if caption_tracks:
+        captions = {key: caption_tracks[key].name for key in caption_tracks.lang_code_index}
+    else:
+        captions = {}
+    try:
+        chapters = [(chapter.title, float(chapter.start_seconds)) for chapter in yt.chapters]
+    except Exception:
+        # Chapters are optional; their markup changes more often than the rest of the page
+        chapters = []
+    return VideoHandle(video_id, yt.title, yt.length, captions, caption_tracks, chapters)
+
+def get_video_handle(url: str) -> VideoHandle:
+    """
+    Returns the cached handle of the video, fetching it from YouTube on the first request.
+
+    Concurrent requests for the same video share a single fetch.
+
+    Args:
+        url (str): The URL of the YouTube video.
+
+    Returns:
+        VideoHandle: The video metadata and caption tracks.
+    """
+    try:
+        video_id = extract_video_id(url)
+    except ValueError:
+        video_id = url
+    video = _video_cache.get(video_id)
+    metrics.record_cache("video", video is not None)
+    if video is None:
+        video = _video_cache.get_or_load(video_id, lambda: _fetch_video_handle(url, video_id))
+    return video
+
+@track_stage("get_video_info")
 def get_video_info(url: str) -> Dict[str, str]:
     """
     Returns the title and length of the video.
@@ -31,14 +133,9 @@ def get_video_info(url: str) -> Dict[str, str]:
         Dict[str, str]: A dictionary containing the video title and length in seconds.
     """
     try:
-        # Configure SSL context globally for urllib
-        ssl_context = create_ssl_context()
-        # Apply SSL context to the default HTTPS context
-        ssl._create_default_https_context = lambda: ssl_context
-        
-        yt = YouTube(url, on_progress_callback=on_progress)
-        yt_length = time.strftime("%H:%M:%S", time.gmtime(yt.length))
-        return {"title": yt.title, "length": yt_length}
+        video = get_video_handle(url)
+        yt_length = time.strftime("%H:%M:%S", time.gmtime(video.length))
+        return {"title": video.title, "length": yt_length}
     except ssl.SSLError as e:
         raise RuntimeError(f"SSL certificate error. Please check your internet connection and try again. Details: {str(e)}")
     except Exception as e:
@@ -51,6 +148,7 @@ def get_video_info(url: str) -> Dict[str, str]:
         else:
             raise RuntimeError(f"Error fetching video information: {str(e)}")
 
+@track_stage("find_captions")
 def find_captions(url: str) -> Dict[str, str]:
     """
     Finds all available captions for the video and returns a dictionary of language codes and names.
@@ -62,16 +160,8 @@ def find_captions(url: str) -> Dict[str, str]:
         Dict[str, str]: A dictionary containing the language codes and names of the available captions.
     """
     try:
-        # Configure SSL context globally for urllib
-        ssl_context = create_ssl_context()
-        ssl._create_default_https_context = lambda: ssl_context
-        
-        yt = YouTube(url, on_progress_callback=on_progress, use_oauth=False, allow_oauth_cache=False)
-        if not yt.captions:
-            return {}
-        else:
-            captions = {key: yt.captions[key].name for key in yt.captions.lang_code_index}
-            return captions
+        video = get_video_handle(url)
+        return dict(video.captions)
     except ssl.SSLError as e:
         raise RuntimeError(f"SSL certificate error while fetching captions. Please check your internet connection and try again. Details: {str(e)}")
     except Exception as e:
@@ -80,10 +170,22 @@ def find_captions(url: str) -> Dict[str, str]:
         else:
             raise RuntimeError(f"Error fetching captions: {str(e)}")
 
+def _index_captions(video: VideoHandle, caption_language: str, segments: CaptionSegments) -> None:
+    # Adds the track, with timestamps, to the search index of processed videos; runs in the background
+    def task(index: SearchIndex) -> None:
+        if not index.has_document(video.video_id, "captions", caption_language):
+            index.add_captions(video.video_id, video.title, caption_language, segments)
+    index_in_background(task)
+
+@track_stage("retrieve_subtitles")
 def retrieve_subtitles(url: str, selected_caption_language: str) -> str:
     """
     Retrieves the subtitles for the video in the preferred language.
 
+    The text is built from the timed json3 track with one caption per line, so compaction can
+    collapse the rolling duplicates of auto-generated captions; pytubefix's own text export joins
+    every caption on a single line.
+
     Args:
         url (str): The URL of the YouTube video.
         selected_caption_language (str): Preferred language code (e.g., 'en', 'ru').
@@ -92,23 +194,28 @@ def retrieve_subtitles(url: str, selected_caption_language: str) -> str:
         str: The subtitles text.
     """
     try:
-        # Configure SSL context globally for urllib
-        ssl_context = create_ssl_context()
-        ssl._create_default_https_context = lambda: ssl_context
-        
-        yt = YouTube(url, on_progress_callback=on_progress, use_oauth=False, allow_oauth_cache=False)
-        raw_captions = yt.captions
+        video = get_video_handle(url)
+        raw_captions = video.caption_tracks
         
         # Check once again if there are any captions
         if not raw_captions:
             return ""
         
-        captions = {key: yt.captions[key].name for key in yt.captions.lang_code_index}
+        captions = video.captions
         selected_code = [key for key, value in captions.items() if value == selected_caption_language][0]
         
-        captions_text = raw_captions[selected_code].generate_txt_captions()
-        
-        return captions_text
+        try:
+            segments = video.caption_segments(selected_code)
+        except Exception as e:
+            # pytubefix asserts on tracks it cannot read, and the json3 download can fail on its own
+            print(f"Could not load timed captions, using the plain text track: {type(e).__name__}: {e}")
+            segments = CaptionSegments()
+        if not len(segments):
+            # Tracks without timed events still have a plain text export
+            return raw_captions[selected_code].generate_txt_captions()
+        _index_captions(video, selected_caption_language, segments)
+
+        return segments.text()
 
     except ssl.SSLError as e:
         print(f"SSL certificate error retrieving subtitles: {e}")
@@ -120,3 +227,46 @@ def retrieve_subtitles(url: str, selected_caption_language: str) -> str:
         else:
             print(f"Error retrieving subtitles: {e}")
             return ""
+
+@track_stage("retrieve_segments")
+def retrieve_segments(url: str, selected_caption_language: str) -> CaptionSegments:
+    """
+    Retrieves the timed subtitle segments for the video in the preferred language.
+
+    Args:
+        url (str): The URL of the YouTube video.
+        selected_caption_language (str): The display name of the caption track, as returned by `find_captions`.
+
+    Returns:
+        CaptionSegments: The segments with their start times and durations; empty if unavailable.
+    """
+    try:
+        video = get_video_handle(url)
+        if not video.caption_tracks:
+            return CaptionSegments()
+
+        selected_code = [key for key, value in video.captions.items() if value == selected_caption_language][0]
+        # Usually parsed already, when the subtitles of the same track were retrieved
+        return video.caption_segments(selected_code)
+
+    except ssl.SSLError as e:
+        raise RuntimeError(f"SSL certificate error while retrieving subtitles. Please check your internet connection and try again. Details: {str(e)}")
+    except Exception as e:
+        print(f"Error retrieving subtitle segments: {e}")
+        return CaptionSegments()
+
+def get_video_chapters(url: str) -> List[Tuple[str, float]]:
+    """
+    Returns the video's own chapters.
+
+    Args:
+        url (str): The URL of the YouTube video.
+
+    Returns:
+        List[Tuple[str, float]]: Chapter titles and start times in seconds; empty if the video has none.
+    """
+    try:
+        return list(get_video_handle(url).chapters)
+    except Exception as e:
+        print(f"Error fetching chapters: {e}")
+        return []
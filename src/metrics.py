@@ -0,0 +1,313 @@
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from src.text_processing import estimate_tokens
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger("video_summary.metrics")
+
+# Upper bounds of the stage duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# When set, metrics are also written to this file in the Prometheus text format
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_FILE_INTERVAL = 5.0
+# Interface the metrics server listens on; only local scrapers can reach it unless this is changed
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
+
+class _StageStats:
+    __slots__ = ("calls", "errors", "duration_sum", "buckets", "input_chars", "output_chars", "input_tokens", "output_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.duration_sum = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.input_chars = 0
+        self.output_chars = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, data: dict) -> None:
+        # Adds the totals of another registry's state (see MetricsRegistry.state)
+        for name in self.__slots__:
+            if name == "buckets":
+                self.buckets = [a + b for a, b in zip(self.buckets, data["buckets"])]
+            else:
+                setattr(self, name, getattr(self, name) + data[name])
+
+
+class MetricsRegistry:
+    """
+    Thread-safe, in-process collection of per-stage latency, size and cache metrics.
+
+    Stages record their duration, input/output sizes and estimated token counts; caches record
+    hits and misses. Everything can be rendered in the Prometheus text exposition format.
+
+    Other processes (the job workers) export their totals as JSON state files instead; a registry
+    collecting their directory adds them to what it renders, so one endpoint or file covers all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._cache = {}  # (cache, result) -> count
+        self._last_file_write = 0.0
+        self._file_path = METRICS_FILE
+        self._state_path = None
+        self._collect_dirs = []
+
+    def record_stage(self, stage: str, duration: float, error: bool = False, input_text: Optional[str] = None,
+                     output_text: Optional[str] = None) -> None:
+        """Records one run of a pipeline stage and logs it as a structured JSON line."""
+        event = {"event": "stage", "stage": stage, "duration": round(duration, 4), "status": "error" if error else "ok"}
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats()
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.duration_sum += duration
+            stats.buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+            if input_text is not None:
+                tokens = estimate_tokens(input_text)
+                stats.input_chars += len(input_text)
+                stats.input_tokens += tokens
+                event.update(input_chars=len(input_text), input_tokens=tokens)
+            if output_text is not None:
+                tokens = estimate_tokens(output_text)
+                stats.output_chars += len(output_text)
+                stats.output_tokens += tokens
+                event.update(output_chars=len(output_text), output_tokens=tokens)
+        logger.info(json.dumps(event))
+        self._maybe_write_file()
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Records a lookup in one of the caches."""
+        key = (cache, "hit" if hit else "miss")
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+        logger.info(json.dumps({"event": "cache", "cache": cache, "result": key[1]}))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Returns the per-stage totals as plain dictionaries."""
+        with self._lock:
+            return {
+                stage: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "duration_sum": stats.duration_sum,
+                    "input_tokens": stats.input_tokens,
+                    "output_tokens": stats.output_tokens,
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def state(self) -> dict:
+        """Returns all totals as JSON-serializable data, for merging into another process's registry."""
+        with self._lock:
+            return {
+                "stages": {stage: {name: getattr(stats, name) for name in _StageStats.__slots__} for stage, stats in self._stages.items()},
+                "cache": [[cache, result, count] for (cache, result), count in self._cache.items()],
+            }
+
+    def export_state(self, path: str) -> None:
+        """Writes the state to `path` every few seconds instead of writing METRICS_FILE (used by job workers)."""
+        self._state_path = path
+        self._file_path = None
+
+    def collect_from(self, directory: str) -> None:
+        """Adds the state files exported to `directory` by other processes to the rendered metrics."""
+        if directory not in self._collect_dirs:
+            self._collect_dirs.append(directory)
+
+    def flush(self) -> None:
+        """Writes the metrics file or the exported state now."""
+        with self._lock:
+            self._last_file_write = time.monotonic()
+        self._write_outputs()
+
+    def _merged(self) -> Tuple[Dict[str, _StageStats], Dict[Tuple[str, str], int]]:
+        states = []
+        for directory in self._collect_dirs:
+            for path in glob.glob(os.path.join(directory, "*.json")):
+                try:
+                    with open(path, encoding="utf-8") as file:
+                        states.append(json.load(file))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Could not read metrics state {path}: {e}")
+        stages = {}
+        cache = {}
+        for state in [self.state()] + states:
+            for stage, data in state["stages"].items():
+                stages.setdefault(stage, _StageStats()).add(data)
+            for name, result, count in state["cache"]:
+                cache[(name, result)] = cache.get((name, result), 0) + count
+        return stages, cache
+
+    def render_prometheus(self) -> str:
+        """Renders all metrics, including those collected from other processes, in the Prometheus text exposition format."""
+        lines = [
+            "# HELP video_summary_stage_duration_seconds Duration of pipeline stages.",
+            "# TYPE video_summary_stage_duration_seconds histogram",
+        ]
+        merged_stages, merged_cache = self._merged()
+        stages = sorted(merged_stages.items())
+        for stage, stats in stages:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), stats.buckets):
+                cumulative += count
+                lines.append(f'video_summary_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'video_summary_stage_duration_seconds_sum{{stage="{stage}"}} {stats.duration_sum:.6f}')
+            lines.append(f'video_summary_stage_duration_seconds_count{{stage="{stage}"}} {stats.calls}')
+
+        counters = (
+            ("stage_errors_total", "Failed runs of pipeline stages.", "errors"),
+            ("stage_input_chars_total", "Characters of text fed into pipeline stages.", "input_chars"),
+            ("stage_output_chars_total", "Characters of text produced by pipeline stages.", "output_chars"),
+            ("stage_input_tokens_total", "Estimated tokens fed into pipeline stages.", "input_tokens"),
+            ("stage_output_tokens_total", "Estimated tokens produced by pipeline stages.", "output_tokens"),
+        )
+        for name, help_text, attribute in counters:
+            lines.append(f"# HELP video_summary_{name} {help_text}")
+            lines.append(f"# TYPE video_summary_{name} counter")
+            for stage, stats in stages:
+                lines.append(f'video_summary_{name}{{stage="{stage}"}} {getattr(stats, attribute)}')
+
+        lines.append("# HELP video_summary_cache_requests_total Cache lookups by cache and result.")
+        lines.append("# TYPE video_summary_cache_requests_total counter")
+        for (cache, result), count in sorted(merged_cache.items()):
+            lines.append(f'video_summary_cache_requests_total{{cache="{cache}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str) -> None:
+        """Writes the metrics to `path` atomically, for node-exporter style textfile collection."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+    def write_state(self, path: str) -> None:
+        """Writes the state to `path` atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.state(), file)
+        os.replace(temp_path, path)
+
+    def _maybe_write_file(self) -> None:
+        if not self._file_path and not self._state_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_file_write < METRICS_FILE_INTERVAL:
+                return
+            self._last_file_write = now
+        self._write_outputs()
+
+    def _write_outputs(self) -> None:
+        try:
+            if self._file_path:
+                self.write_file(self._file_path)
+            if self._state_path:
+                self.write_state(self._state_path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics: {e}")
+
+
+metrics = MetricsRegistry()
+
+
+def track_stage(stage: str, text_arg: Optional[str] = None) -> Callable:
+    """
+    Decorator recording the duration, sizes and outcome of a pipeline stage.
+
+    Works on plain functions and on generator functions; a generator is timed until it is exhausted
+    and its output size is the total of the yielded pieces.
+
+    Args:
+        stage (str): The stage name used in the metrics.
+        text_arg (Optional[str]): Name of the argument holding the stage's input text, if any.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def input_text(args, kwargs) -> Optional[str]:
+            if text_arg is None:
+                return None
+            value = signature.bind_partial(*args, **kwargs).arguments.get(text_arg)
+            return value if isinstance(value, str) else None
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                produced = []
+                error = True
+                try:
+                    for piece in func(*args, **kwargs):
+                        produced.append(piece)
+                        yield piece
+                    error = False
+                finally:
+                    metrics.record_stage(stage, time.perf_counter() - start_time, error,
+                                         input_text(args, kwargs), "".join(produced))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = None
+            error = True
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                metrics.record_stage(stage, time.perf_counter() - start_time, error, input_text(args, kwargs),
+                                     result if isinstance(result, str) else None)
+        return wrapper
+    return decorator
+
+
+_server: Optional[Tuple["ThreadingHTTPServer", threading.Thread]] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = METRICS_HOST) -> None:
+    """Serves the metrics at http://<host>:<port>/metrics from a daemon thread; later calls do nothing."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+        # http.server is only imported when metrics are actually served
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        _server = (server, thread)
@@ -0,0 +1,164 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.llm_actions import detect_language, get_full_transcription, result_key, stream_full_transcription, stream_summary, summarize_text
+from src.media_processing import retrieve_subtitles
+from src.metrics import metrics
+from src.result_store import get_result_store, make_key
+from src.shared_store import get_shared_store
+from src.text_processing import compact_transcript
+from src.utils import extract_video_id
+
+
+def load_subtitles(url: str, caption_language: str) -> Tuple[str, str, Optional[dict]]:
+    """
+    Returns the compacted subtitles of a caption track from the shared store, fetching them once per process.
+
+    The compacted subtitles are also checkpointed in the on-disk result store, so a retry after a failed
+    generation, in this or another process, does not download them again.
+
+    Args:
+        url (str): The YouTube video URL.
+        caption_language (str): The display name of the caption track.
+
+    Returns:
+        Tuple[str, str, Optional[dict]]: The store key, the compacted subtitles and the compaction
+        statistics (None when the subtitles were already in the shared store or checkpointed on disk).
+
+    Raises:
+        RuntimeError: If the subtitles could not be retrieved; nothing is stored, so the next call tries again.
+    """
+    key = make_key(task="subtitles", source=extract_video_id(url), caption_language=caption_language)
+    compaction = {}
+
+    def load():
+        store = get_result_store()
+        text = store.get(key)
+        metrics.record_cache("subtitles", text is not None)
+        if text is None:
+            text, stats = compact_transcript(retrieve_subtitles(url, caption_language))
+            if not text.strip():
+                # Failed downloads return no text; raising keeps it out of both stores
+                raise RuntimeError("Could not retrieve subtitles. Please try a different video.")
+            compaction.update(stats)
+            store.put(key, text)
+        return text
+
+    text = get_shared_store().get_or_load(key, load)
+    return key, text, compaction or None
+
+
+def output_keys(subtitles_text: str, chosen_language: str, video_id: Optional[str] = None,
+                caption_language: Optional[str] = None) -> Dict[str, str]:
+    """Returns the store keys of the summary and the full transcript, as used by `iter_llm_stream`."""
+    return {
+        "summary": result_key("summary", subtitles_text, video_id, caption_language, chosen_language),
+        "full_transcript": result_key("full_transcript", subtitles_text, video_id, caption_language),
+    }
+
+
+def iter_llm_results(subtitles_text: str, chosen_language: str, gemini_key: str, video_id: Optional[str] = None,
+                     caption_language: Optional[str] = None, caption_code: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Runs the summary and full transcript generation concurrently and yields each result as soon as it is ready.
+
+    Language detection runs alongside the transcript call, so only the summary waits for it.
+
+    Args:
+        subtitles_text (str): The subtitles text.
+        chosen_language (str): The language in which the summary should be written ("" for the original language).
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the result cache.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
+    Yields:
+        Tuple[str, str]: ("summary", text) and ("full_transcript", text), in order of completion.
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        transcript_future = executor.submit(
+            get_full_transcription, subtitles_text, gemini_key=gemini_key,
+            video_id=video_id, caption_language=caption_language,
+        )
+        language_future = executor.submit(detect_language, subtitles_text, video_id, caption_language, caption_code)
+        summary_future = executor.submit(
+            lambda: summarize_text(subtitles_text, chosen_language=chosen_language, gemini_key=gemini_key,
+                                   video_id=video_id, caption_language=caption_language,
+                                   detected_language=language_future.result()),
+        )
+        names = {summary_future: "summary", transcript_future: "full_transcript"}
+        for future in as_completed(names):
+            yield names[future], future.result()
+
+
+def run_llm_jobs(subtitles_text: str, chosen_language: str, gemini_key: str, video_id: Optional[str] = None,
+                 caption_language: Optional[str] = None, caption_code: Optional[str] = None) -> Dict[str, str]:
+    """
+    Runs the summary and full transcript generation concurrently and returns both results.
+
+    Args:
+        subtitles_text (str): The subtitles text.
+        chosen_language (str): The language in which the summary should be written ("" for the original language).
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the result cache.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
+    Returns:
+        Dict[str, str]: The results keyed by "summary" and "full_transcript".
+    """
+    return dict(iter_llm_results(subtitles_text, chosen_language, gemini_key, video_id, caption_language, caption_code))
+
+
+def iter_llm_stream(subtitles_text: str, chosen_language: str, gemini_key: str, video_id: Optional[str] = None,
+                    caption_language: Optional[str] = None, caption_code: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Streams the summary and full transcript generated concurrently, interleaving their pieces as they arrive.
+
+    Both go through the shared store: sessions asking for the same outputs at the same time follow
+    one generation, and finished outputs are served from memory.
+
+    Args:
+        subtitles_text (str): The subtitles text.
+        chosen_language (str): The language in which the summary should be written ("" for the original language).
+        gemini_key (str): Gemini API key.
+        video_id (Optional[str]): The YouTube video ID, used for the result cache.
+        caption_language (Optional[str]): The caption track the text was taken from.
+        caption_code (Optional[str]): The caption track code (e.g. 'a.en'), which gives the transcript language for free.
+
+    Yields:
+        Tuple[str, str]: ("summary", piece) and ("full_transcript", piece) pairs, in order of arrival.
+    """
+    pieces = queue.Queue()
+    done = object()
+
+    def produce(name, stream):
+        try:
+            for piece in stream:
+                pieces.put((name, piece))
+        finally:
+            pieces.put((name, done))
+
+    shared_store = get_shared_store()
+    keys = output_keys(subtitles_text, chosen_language, video_id, caption_language)
+    streams = {
+        # The summary stream detects the language itself, overlapping with the transcript call
+        "summary": shared_store.stream(keys["summary"], lambda: stream_summary(
+            subtitles_text, chosen_language=chosen_language, gemini_key=gemini_key,
+            video_id=video_id, caption_language=caption_language, caption_code=caption_code), persisted=True),
+        "full_transcript": shared_store.stream(keys["full_transcript"], lambda: stream_full_transcription(
+            subtitles_text, gemini_key=gemini_key, video_id=video_id, caption_language=caption_language), persisted=True),
+    }
+    with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+        futures = [executor.submit(produce, name, stream) for name, stream in streams.items()]
+        remaining = len(streams)
+        while remaining:
+            name, piece = pieces.get()
+            if piece is done:
+                remaining -= 1
+            else:
+                yield name, piece
+        # Surface the first producer error, if any
+        for future in futures:
+            future.result()
@@ -0,0 +1,216 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Priorities of queued LLM calls; lower runs first
+INTERACTIVE = 0
+BATCH = 10
+
+# Per-API-key budgets, matching the quota of the key in use
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", 60))
+GEMINI_TPM = int(os.environ.get("GEMINI_TPM", 1_000_000))
+# Retries of transient failures (rate limits, quota, timeouts, 5xx)
+MAX_RETRIES = 5
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+WINDOW_SECONDS = 60.0
+# Errors worth retrying, by class name so that the SDKs (google.api_core, google.genai, httpx,
+# requests) need not be imported: rate limits, exhausted quota, timeouts, dropped connections and 5xx
+_TRANSIENT_ERRORS = frozenset((
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+    "BadGateway", "GatewayTimeout", "TimeoutError", "ConnectionError", "ReadTimeout", "ConnectTimeout",
+    "TimeoutException", "ConnectError", "RemoteProtocolError", "RemoteDisconnected", "URLError",
+))
+_RATE_LIMIT_ERRORS = frozenset(("ResourceExhausted", "TooManyRequests"))
+_TRANSIENT_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+RATE_LIMIT_STATUS = 429
+
+
+def _error_chain(error: BaseException):
+    # The error and the errors it was raised from or while handling, e.g. the SDK error behind a RuntimeError
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # HTTP status of an API error: `code` (google.api_core, google.genai, urllib), `status_code`,
+    # or that of the attached response (httpx, requests)
+    response = getattr(error, "response", None)
+    for value in (getattr(error, "code", None), getattr(error, "status_code", None), getattr(response, "status_code", None)):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def _matches(error: BaseException, names: frozenset, statuses: frozenset) -> bool:
+    for cause in _error_chain(error):
+        if any(cls.__name__ in names for cls in type(cause).__mro__) or _status_code(cause) in statuses:
+            return True
+    return False
+
+
+def is_transient(error: Exception) -> bool:
+    """Returns True for errors worth retrying: rate limits, exhausted quota, timeouts and server errors."""
+    return _matches(error, _TRANSIENT_ERRORS, _TRANSIENT_STATUSES)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Returns True for rate-limit and exhausted-quota errors (HTTP 429)."""
+    return _matches(error, _RATE_LIMIT_ERRORS, frozenset((RATE_LIMIT_STATUS,)))
+
+
+class _KeyBudget:
+    # Sliding one-minute window of the requests and tokens spent with one API key.
+    # The request limit adapts: halved on a rate-limit error, raised back by one on each success.
+
+    def __init__(self, rpm: int, tpm: int):
+        self.max_rpm = rpm
+        self.rpm = float(rpm)
+        self.tpm = tpm
+        self.calls = deque()  # (timestamp, tokens)
+        self.tokens = 0
+        self.waiting = []  # heap of (priority, sequence)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        while self.calls and self.calls[0][0] <= now - WINDOW_SECONDS:
+            _, spent = self.calls.popleft()
+            self.tokens -= spent
+        waits = [0.0]
+        if len(self.calls) >= int(self.rpm):
+            waits.append(self.calls[len(self.calls) - int(self.rpm)][0] + WINDOW_SECONDS - now)
+        if self.calls and self.tokens + tokens > self.tpm:
+            # Wait until enough old calls leave the window; a single call above the budget runs alone
+            freed = self.tokens + tokens - self.tpm
+            for timestamp, spent in self.calls:
+                freed -= spent
+                if freed <= 0:
+                    waits.append(timestamp + WINDOW_SECONDS - now)
+                    break
+        return max(waits)
+
+
+class GeminiScheduler:
+    """
+    Shared scheduler for Gemini calls with per-API-key request and token budgets.
+
+    Calls wait in a priority queue per key (interactive before batch, then first come first served)
+    until the key's requests-per-minute and tokens-per-minute budgets allow them. Transient failures
+    are retried with jittered exponential backoff, and rate-limit errors lower the key's request budget.
+
+    Args:
+        rpm (int): Requests per minute allowed per API key.
+        tpm (int): Estimated tokens per minute allowed per API key.
+        max_retries (int): Number of retries of a transient failure.
+    """
+
+    def __init__(self, rpm: int = GEMINI_RPM, tpm: int = GEMINI_TPM, max_retries: int = MAX_RETRIES):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._budgets = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+    def acquire(self, key_id: str, tokens: int, priority: int = INTERACTIVE) -> None:
+        """
+        Blocks until a call of `tokens` estimated tokens may run under the key's budget, then records it.
+
+        Args:
+            key_id (str): Identifier of the API key (a hash, never the key itself).
+            tokens (int): The estimated tokens of the call.
+            priority (int): INTERACTIVE or BATCH; lower values are served first.
+        """
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            budget = self._budgets.get(key_id)
+            if budget is None:
+                budget = self._budgets[key_id] = _KeyBudget(self.rpm, self.tpm)
+            heapq.heappush(budget.waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if budget.waiting[0] == ticket:
+                        wait = budget.wait_time(tokens, now)
+                        if wait <= 0:
+                            break
+                        self._condition.wait(timeout=wait)
+                    else:
+                        self._condition.wait()
+                budget.calls.append((now, tokens))
+                budget.tokens += tokens
+            finally:
+                budget.waiting.remove(ticket)
+                heapq.heapify(budget.waiting)
+                self._condition.notify_all()
+
+    def report(self, key_id: str, error: Optional[Exception] = None) -> None:
+        """Adapts the key's request budget to the outcome of a call."""
+        with self._condition:
+            budget = self._budgets.get(key_id)
+            if budget is None:
+                return
+            if error is not None and is_rate_limited(error):
+                budget.rpm = max(1.0, budget.rpm / 2)
+            elif error is None:
+                budget.rpm = min(float(budget.max_rpm), budget.rpm + 1)
+            self._condition.notify_all()
+
+    def retry_delay(self, attempt: int) -> float:
+        """Returns the jittered exponential backoff delay before retry number `attempt` (from 0)."""
+        return random.uniform(0, min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * 2 ** attempt))
+
+    def call(self, key_id: str, fn: Callable[[], T], tokens: int, priority: int = INTERACTIVE) -> T:
+        """
+        Runs `fn` under the key's budget, retrying transient failures.
+
+        Args:
+            key_id (str): Identifier of the API key.
+            fn (Callable[[], T]): The call to make.
+            tokens (int): The estimated tokens of the call.
+            priority (int): INTERACTIVE or BATCH.
+
+        Returns:
+            T: The result of `fn`.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(key_id, tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                self.report(key_id, e)
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                time.sleep(self.retry_delay(attempt))
+            else:
+                self.report(key_id)
+                return result
+
+
+_scheduler = GeminiScheduler()
+
+
+def get_scheduler() -> GeminiScheduler:
+    """Returns the process-wide Gemini scheduler."""
+    return _scheduler
+
+
+def share_budget(shares: int) -> None:
+    """
+    Gives this process's scheduler 1/`shares` of the GEMINI_RPM and GEMINI_TPM budgets.
+
+    Schedulers do not coordinate across processes, so processes calling Gemini with the same
+    keys (the job workers) each take a share of the quota instead.
+    """
+    global _scheduler
+    _scheduler = GeminiScheduler(rpm=max(1, GEMINI_RPM // shares), tpm=max(1, GEMINI_TPM // shares))
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Location and size budget of the on-disk result cache
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", os.path.join(".cache", "results.sqlite3"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# The size total is kept in memory; it is re-read this often to include other processes' writes
+RESULT_CACHE_RESYNC_SECONDS = 60.0
+
+
+def text_digest(text: str) -> str:
+    """Return the SHA-256 hex digest of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(**parts) -> str:
+    """
+    Build a content-addressed cache key from named parts.
+
+    Args:
+        **parts: Values identifying the result (video ID, languages, model, prompt hash...).
+
+    Returns:
+        str: A stable hex digest of the parts.
+    """
+    return text_digest(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+
+class ResultStore:
+    """
+    Persistent SQLite-backed store for generated texts with size-bounded LRU eviction.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        max_bytes (int): Total size of stored values above which the least recently used are evicted.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        self._conn.commit()
+        self._resync_locked()
+
+    def _resync_locked(self) -> None:
+        # Running total of the stored sizes, updated on every insert and delete in between scans
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        self._synced_at = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored value for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def has(self, key: str) -> bool:
+        """Return True if a value is stored under `key`, without counting a hit or a miss."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, key: str, value: str) -> None:
+        """Store `value` under `key` and evict old entries if the size budget is exceeded."""
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number and size of entries."""
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def _evict_locked(self) -> None:
+        if time.monotonic() - self._synced_at > RESULT_CACHE_RESYNC_SECONDS:
+            self._resync_locked()
+        if self._bytes <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._bytes -= size
+            if self._bytes <= self.max_bytes:
+                break
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Return the process-wide result store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
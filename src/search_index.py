@@ -0,0 +1,208 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.segments import CaptionSegments
+
+# Location of the on-disk full-text index of every processed video
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", os.path.join(".cache", "search.sqlite3"))
+# Captions are indexed in windows of this many seconds, so hits point at a moment of the video
+INDEX_WINDOW_SECONDS = 30.0
+SNIPPET_TOKENS = 16
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching passages that contain every word (prefix match on the last one)."""
+    words = _WORD.findall(query)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def hit_url(video_id: str, start: Optional[float]) -> str:
+    """Return the YouTube URL of a search hit, starting at its timestamp when it has one."""
+    url = f"https://youtu.be/{video_id}"
+    return f"{url}?t={int(start)}" if start is not None else url
+
+
+class SearchIndex:
+    """
+    On-disk BM25 full-text index of captions and formatted transcripts, backed by SQLite FTS5.
+
+    Caption tracks are indexed in timed windows, so a hit links to its moment in the video;
+    formatted transcripts are indexed by paragraph. Queries are answered by the FTS5 index
+    without loading any transcript into memory.
+
+    Args:
+        path (str): Path of the SQLite database file.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                title TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                source TEXT NOT NULL,
+                first_passage INTEGER,
+                last_passage INTEGER,
+                UNIQUE (video_id, kind, source)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                text, doc_id UNINDEXED, start UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        self._conn.commit()
+
+    def has_document(self, video_id: str, kind: str, source: str) -> bool:
+        """Return True if the document is already indexed."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM documents WHERE video_id = ? AND kind = ? AND source = ?",
+                                     (video_id, kind, source)).fetchone()
+        return row is not None
+
+    def add_captions(self, video_id: str, title: Optional[str], caption_language: str, segments: CaptionSegments,
+                     window_seconds: float = INDEX_WINDOW_SECONDS) -> None:
+        """
+        Index a caption track in timed windows, replacing an earlier version of the same track.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            title (Optional[str]): The video title.
+            caption_language (str): The display name of the caption track.
+            segments (CaptionSegments): The timed captions.
+            window_seconds (float): Length of an indexed window in seconds.
+        """
+        passages = []
+        first = 0
+        for i in range(len(segments)):
+            if i + 1 == len(segments) or segments.starts[i + 1] - segments.starts[first] >= window_seconds:
+                passages.append((" ".join(segments.texts[first:i + 1]), segments.starts[first]))
+                first = i + 1
+        self._replace(video_id, title, "captions", caption_language, passages)
+
+    def add_transcript(self, video_id: str, caption_language: Optional[str], text: str) -> None:
+        """Index a formatted transcript by paragraph, replacing an earlier version from the same caption track."""
+        passages = [(paragraph.strip(), None) for paragraph in _PARAGRAPH_BREAK.split(text) if paragraph.strip()]
+        self._replace(video_id, None, "transcript", caption_language or "", passages)
+
+    def search(self, query: str, limit: int = 10, hits_per_video: int = 3, highlight: tuple = ("**", "**")) -> List[dict]:
+        """
+        Find the videos that talked about `query`, best BM25 match first.
+
+        Args:
+            query (str): The search words; every word must appear in a passage.
+            limit (int): Maximum number of videos.
+            hits_per_video (int): Maximum number of passages returned per video.
+            highlight (tuple): Markers placed around the matched words in the snippets.
+
+        Returns:
+            List[dict]: One entry per video with "video_id", "title", "score" and "hits", a list of
+            passages with "kind" ("captions" or "transcript"), "start" (seconds, None for transcripts) and "snippet".
+        """
+        expression = match_query(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT d.video_id, v.title, d.kind, m.start, m.snippet, m.rank
+                   FROM (SELECT doc_id, start, snippet(passages, 0, ?, ?, '…', ?) AS snippet, rank
+                         FROM passages WHERE passages MATCH ? ORDER BY rank LIMIT ?) AS m
+                   JOIN documents AS d ON d.id = m.doc_id
+                   LEFT JOIN videos AS v ON v.video_id = d.video_id
+                   ORDER BY m.rank""",
+                (highlight[0], highlight[1], SNIPPET_TOKENS, expression, limit * hits_per_video * 4),
+            ).fetchall()
+
+        videos = {}
+        for video_id, title, kind, start, snippet, rank in rows:
+            video = videos.get(video_id)
+            if video is None:
+                if len(videos) == limit:
+                    continue
+                # FTS5 ranks are negated BM25 scores: lower is better
+                video = videos[video_id] = {"video_id": video_id, "title": title or video_id, "score": round(-rank, 3), "hits": []}
+            if len(video["hits"]) < hits_per_video:
+                video["hits"].append({"kind": kind, "start": start, "snippet": snippet})
+        return list(videos.values())
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of indexed videos, documents and passages."""
+        with self._lock:
+            videos = self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            passages = self._conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return {"videos": videos, "documents": documents, "passages": passages}
+
+    def _replace(self, video_id: str, title: Optional[str], kind: str, source: str, passages: List[tuple]) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO videos (video_id, title, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (video_id) DO UPDATE SET title = COALESCE(excluded.title, title), updated_at = excluded.updated_at",
+                    (video_id, title, time.time()),
+                )
+                row = self._conn.execute("SELECT id, first_passage, last_passage FROM documents WHERE video_id = ? AND kind = ? AND source = ?",
+                                         (video_id, kind, source)).fetchone()
+                if row is None:
+                    doc_id = self._conn.execute("INSERT INTO documents (video_id, kind, source) VALUES (?, ?, ?)",
+                                                (video_id, kind, source)).lastrowid
+                else:
+                    doc_id = row[0]
+                    # A document's passages have consecutive rowids, so they are dropped without scanning the index
+                    self._conn.execute("DELETE FROM passages WHERE rowid BETWEEN ? AND ?", (row[1], row[2]))
+                last = self._conn.execute("SELECT rowid FROM passages ORDER BY rowid DESC LIMIT 1").fetchone()
+                first = last[0] + 1 if last else 1
+                self._conn.executemany("INSERT INTO passages (rowid, text, doc_id, start) VALUES (?, ?, ?, ?)",
+                                       [(first + i, text, doc_id, start) for i, (text, start) in enumerate(passages)])
+                self._conn.execute("UPDATE documents SET first_passage = ?, last_passage = ? WHERE id = ?",
+                                   (first, first + len(passages) - 1, doc_id))
+
+
+_index = None
+_index_lock = threading.Lock()
+# Indexing happens off the request path, one write at a time
+_indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-indexer")
+
+
+def get_search_index() -> SearchIndex:
+    """Return the process-wide search index, opening it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+
+def index_in_background(task: Callable[[SearchIndex], None]) -> Future:
+    """Run `task` with the search index on the background indexer; failures are printed, never raised."""
+    def run():
+        try:
+            task(get_search_index())
+        except Exception as e:
+            print(f"Indexing failed: {e}")
+    return _indexer.submit(run)
@@ -0,0 +1,135 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Sequence, Tuple
+
+from src.utils import format_timestamp
+
+# Length of a chapter when the video has no chapters of its own
+CHAPTER_WINDOW_SECONDS = 5 * 60
+
+
+class CaptionSegments:
+    """
+    Timed caption segments stored as parallel arrays.
+
+    Start times and durations (in seconds) live in compact `array('d')` buffers and the texts
+    in a list, so multi-hour tracks stay small and can be sliced by time with a binary search.
+    Segments are expected in increasing start order.
+    """
+
+    __slots__ = ("starts", "durations", "texts")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.durations = array("d")
+        self.texts = []
+
+    def append(self, start: float, duration: float, text: str) -> None:
+        self.starts.append(start)
+        self.durations.append(duration)
+        self.texts.append(text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def end(self) -> float:
+        """The end time of the last segment in seconds."""
+        if not self.texts:
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def text(self, first: int = 0, last: int = None) -> str:
+        """Return the texts of segments `first` to `last` (exclusive), one caption per line."""
+        return "\n".join(self.texts[first:last])
+
+    def index_at(self, seconds: float) -> int:
+        """Return the index of the first segment starting at or after `seconds`."""
+        return bisect_left(self.starts, seconds)
+
+    @classmethod
+    def from_json_captions(cls, data: dict) -> "CaptionSegments":
+        """
+        Build segments from a YouTube json3 caption track.
+
+        Args:
+            data (dict): The parsed json3 captions, with an "events" list.
+
+        Returns:
+            CaptionSegments: The segments with text.
+        """
+        segments = cls()
+        for event in data.get("events", []):
+            text = "".join(seg.get("utf8", "") for seg in event.get("segs", []))
+            text = " ".join(text.split())
+            if not text:
+                continue
+            segments.append(event.get("tStartMs", 0) / 1000, event.get("dDurationMs", 0) / 1000, text)
+        return segments
+
+
+class Chapter:
+    """
+    A titled time range of a video and its caption text.
+
+    Attributes:
+        title (str): The chapter title.
+        start (float): The start time in seconds.
+        end (float): The end time in seconds.
+        text (str): The caption text of the chapter.
+    """
+
+    __slots__ = ("title", "start", "end", "text")
+
+    def __init__(self, title: str, start: float, end: float, text: str):
+        self.title = title
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+def group_by_chapters(segments: CaptionSegments, chapters: Sequence[Tuple[str, float]]) -> List[Chapter]:
+    """
+    Groups caption segments by the video's own chapters.
+
+    Args:
+        segments (CaptionSegments): The caption segments.
+        chapters (Sequence[Tuple[str, float]]): Chapter titles and start times in seconds, in order.
+
+    Returns:
+        List[Chapter]: The chapters that contain captions.
+    """
+    if not chapters:
+        return []
+    ends = [start for _, start in chapters[1:]] + [max(segments.end, chapters[-1][1])]
+    grouped = []
+    for i, ((title, start), end) in enumerate(zip(chapters, ends)):
+        first = segments.index_at(start)
+        # The last chapter runs to the end of the captions
+        last = segments.index_at(end) if i < len(chapters) - 1 else len(segments)
+        if first < last:
+            grouped.append(Chapter(title, start, end, segments.text(first, last)))
+    return grouped
+
+
+def group_by_window(segments: CaptionSegments, window_seconds: float = CHAPTER_WINDOW_SECONDS) -> List[Chapter]:
+    """
+    Groups caption segments into fixed-length time windows.
+
+    Args:
+        segments (CaptionSegments): The caption segments.
+        window_seconds (float): The length of a window in seconds.
+
+    Returns:
+        List[Chapter]: The windows that contain captions, titled by their time range.
+    """
+    windows = _window_starts(segments.end, window_seconds)
+    chapters = [(f"{format_timestamp(start)} - {format_timestamp(min(start + window_seconds, segments.end))}", start) for start in windows]
+    return group_by_chapters(segments, chapters)
+
+
+def _window_starts(total: float, window_seconds: float) -> Iterable[float]:
+    start = 0.0
+    while start < total:
+        yield start
+        start += window_seconds
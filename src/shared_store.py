@@ -0,0 +1,196 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from src.metrics import metrics
+from src.result_store import get_result_store
+
+# Memory budget of the texts shared by all sessions of the process
+SHARED_STORE_MAX_BYTES = int(os.environ.get("SHARED_STORE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class _Broadcast:
+    # Pieces of one in-flight generation, replayed to every session following it
+
+    def __init__(self):
+        self.pieces = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def follow(self) -> Iterator[str]:
+        index = 0
+        while True:
+            with self.condition:
+                while index == len(self.pieces) and not self.done:
+                    self.condition.wait()
+                pieces = self.pieces[index:]
+                done, error = self.done, self.error
+            index += len(pieces)
+            yield from pieces
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class SharedStore:
+    """
+    Process-wide, byte-budgeted LRU store of subtitles and generated outputs shared by all sessions.
+
+    Sessions keep only the keys. Texts are evicted least recently used first once their total size
+    exceeds the budget, so memory follows the number of unique videos rather than the number of users.
+    Concurrent requests for a missing key share one producer: the first starts it on a background
+    thread and every request, including the first, streams its pieces as they are generated.
+
+    Args:
+        max_bytes (int): Total UTF-8 size of stored texts above which the least recently used are evicted.
+    """
+
+    def __init__(self, max_bytes: int = SHARED_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (text, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> _Broadcast
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored text for `key`, or None on a miss."""
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: str, value: str) -> None:
+        """Store `value` under `key`, evicting the least recently used texts if the budget is exceeded."""
+        with self._lock:
+            self._put_locked(key, value)
+
+    def pop(self, key: str) -> None:
+        """Drop `key` from the store if present."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stream(self, key: str, produce: Callable[[], Iterable[str]], persisted: bool = False) -> Iterator[str]:
+        """
+        Stream the text stored under `key`, generating it once if it is missing.
+
+        The producer runs on its own thread until it is exhausted, so a session leaving mid-stream
+        does not cancel the generation for the others; the complete text is then stored.
+
+        Args:
+            key (str): The store key.
+            produce (Callable[[], Iterable[str]]): Function returning the pieces of the text.
+                Its exceptions are raised in every session following the generation.
+            persisted (bool): Keep the text only if the producer also saved it in the result store
+                under `key`. Generators skip saving incomplete outputs (e.g. a transcript with
+                unformatted segments), which are then streamed but not shared.
+
+        Yields:
+            str: The stored text in one piece, or the pieces of the generation as they arrive.
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            broadcast = self._inflight.get(key)
+            started = value is None and broadcast is None
+            if started:
+                broadcast = self._inflight[key] = _Broadcast()
+        metrics.record_cache("shared", value is not None)
+        if value is not None:
+            yield value
+            return
+        if started:
+            threading.Thread(target=self._produce, args=(key, broadcast, produce, persisted), name="shared-store-producer", daemon=True).start()
+        else:
+            metrics.record_cache("shared_inflight", True)
+        yield from broadcast.follow()
+
+    def get_or_load(self, key: str, loader: Callable[[], str]) -> str:
+        """Return the text stored under `key`, calling `loader` once to fill it on a miss."""
+        return "".join(self.stream(key, lambda: [loader()]))
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number and total size of stored texts and the number of generations in flight."""
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes, "inflight": len(self._inflight)}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def _produce(self, key: str, broadcast: _Broadcast, produce: Callable[[], Iterable[str]], persisted: bool) -> None:
+        pieces = []
+        error = None
+        try:
+            for piece in produce():
+                pieces.append(piece)
+                with broadcast.condition:
+                    broadcast.pieces.append(piece)
+                    broadcast.condition.notify_all()
+        except Exception as e:
+            error = e
+        keep = error is None and (not persisted or get_result_store().has(key))
+        with self._lock:
+            if keep:
+                self._put_locked(key, "".join(pieces))
+            # Stored before the broadcast is dropped, so no request can start a second generation in between
+            self._inflight.pop(key, None)
+        with broadcast.condition:
+            broadcast.done = True
+            broadcast.error = error
+            broadcast.condition.notify_all()
+
+    def _get_locked(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def _put_locked(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self._data[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+
+
+_shared_store = SharedStore()
+
+
+def get_shared_store() -> SharedStore:
+    """Returns the process-wide shared store."""
+    return _shared_store
+
+
+def get_shared_text(key: str) -> Optional[str]:
+    """
+    Return a text by key from the shared store, falling back to the on-disk result store.
+
+    Generated outputs are stored under their result cache key, so a text evicted from memory
+    is reloaded from disk (and kept in memory again) instead of being regenerated.
+
+    Args:
+        key (str): The store key.
+
+    Returns:
+        Optional[str]: The text, or None if neither store has it.
+    """
+    value = _shared_store.get(key)
+    if value is None:
+        value = get_result_store().get(key)
+        if value is not None:
+            _shared_store.put(key, value)
+    return value
@@ -0,0 +1,273 @@
+import math
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+# Rough number of characters per token for Gemini tokenizers on natural text
+CHARS_PER_TOKEN = 4
+
+# Bracketed non-speech markers such as [Music], [Applause], (laughter)
+NON_SPEECH_PATTERN = re.compile(
+    r"[\[(](?:music|applause|laughter|laughs|laughing|cheering|silence|inaudible|noise|crosstalk|foreign|"
+    r"background music|upbeat music|intro music|outro music)[\])]|[♪♫]+",
+    re.IGNORECASE,
+)
+# SRT/VTT cue timing lines ("00:01:02,500 --> 00:01:04,000 align:start") and the cue numbers before
+# them; times and references in the speech itself ("at 10:30", "John 3:16") are kept
+CUE_TIMING_PATTERN = re.compile(r"^\s*(?:\d{1,2}:)?\d{2}:\d{2}[.,]\d{3}\s*-->\s*(?:\d{1,2}:)?\d{2}:\d{2}[.,]\d{3}\b.*$")
+CUE_NUMBER_PATTERN = re.compile(r"^\s*\d+\s*$")
+# Timestamps that start a line of a timed transcript export ("00:01:05 text")
+LEADING_TIMESTAMP_PATTERN = re.compile(r"^\s*\[?\d{1,2}:\d{2}:\d{2}(?:[.,]\d{1,3})?\]?\s+")
+# Hesitation fillers that carry no meaning; a lone "mm" is left alone, it is also the unit
+FILLER_PATTERN = re.compile(r"(?<![\w'])(?:um+|uh+|uhm+|erm+|hmm+|mmm+)(?![\w'])[,.]?", re.IGNORECASE)
+# Number of trailing words compared when removing rolling caption overlaps
+MAX_OVERLAP_WORDS = 30
+# Shorter overlaps are more likely a genuinely repeated word than a rolling caption
+MIN_OVERLAP_WORDS = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in the text without calling a tokenizer.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _caption_units(text: str) -> List[str]:
+    # Caption lines are the natural boundaries; fall back to sentences for single-line text
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) > 1:
+        return lines
+    return [part for part in re.split(r"(?<=[.!?])\s+", text.strip()) if part]
+
+
+def _split_oversize(unit: str, size: int) -> List[str]:
+    # Cuts a caption longer than `size` characters into pieces of at most `size` characters, on the
+    # last whitespace of each piece when it is in its second half, else at the raw offset (e.g. CJK text)
+    pieces = []
+    while len(unit) > size:
+        cut = max(unit.rfind(" ", 0, size + 1), unit.rfind("\n", 0, size + 1))
+        if cut < size // 2:
+            cut = size
+        pieces.append(unit[:cut].rstrip())
+        unit = unit[cut:].lstrip()
+    if unit:
+        pieces.append(unit)
+    return pieces
+
+
+def split_captions(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits the subtitles text into chunks on caption boundaries.
+
+    Args:
+        text (str): The subtitles text.
+        max_tokens (int): The estimated token budget of a chunk. A single caption longer than
+            the budget is cut into pieces that fit it, on whitespace where there is some.
+
+    Returns:
+        List[str]: The chunks, in order; `estimate_tokens` of each is at most `max_tokens`.
+    """
+    # Budgeted in characters, the unit of estimate_tokens, separators included
+    size = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks = []
+    current = []
+    current_chars = 0
+    for unit in _caption_units(text):
+        for piece in _split_oversize(unit, size):
+            if current and current_chars + 1 + len(piece) > size:
+                chunks.append("\n".join(current))
+                current = []
+                current_chars = 0
+            current_chars += len(piece) + (1 if current else 0)
+            current.append(piece)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _overlap_tail(text: str, overlap_tokens: int) -> str:
+    # The trailing text of a chunk, cut on a word boundary when there is one nearby
+    size = overlap_tokens * CHARS_PER_TOKEN
+    if len(text) <= size:
+        return text.strip()
+    tail = text[-size:]
+    boundary = re.search(r"\s", tail)
+    # Without spaces near the cut (e.g. Chinese or Japanese), the raw characters are used
+    if boundary and boundary.start() < size // 2:
+        tail = tail[boundary.end():]
+    return tail.strip()
+
+
+def split_windows(text: str, max_tokens: int, overlap_tokens: int) -> List[str]:
+    """
+    Splits the subtitles text into overlapping windows on caption boundaries.
+
+    Every window after the first starts with the trailing text of the previous chunk, up to
+    `overlap_tokens`, so that sentences cut at a boundary appear whole in one window. The overlap
+    is taken word by word, since a chunk may be a single long caption line.
+
+    Args:
+        text (str): The subtitles text.
+        max_tokens (int): The estimated token budget of a window, without the overlap.
+        overlap_tokens (int): The estimated token budget of the overlap.
+
+    Returns:
+        List[str]: The windows, in order.
+    """
+    chunks = split_captions(text, max_tokens)
+    windows = chunks[:1]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        overlap = _overlap_tail(previous, overlap_tokens) if overlap_tokens > 0 else ""
+        windows.append(f"{overlap}\n{chunk}" if overlap else chunk)
+    return windows
+
+
+# Sentences are compared on this many leading characters, keeping seam matching linear in text length
+SENTENCE_KEY_CHARS = 200
+# A seam is only cut on repeated text at least this long, so short sentences ("Okay.", "Thank you.")
+# that genuinely recur around a seam are never taken for the overlap
+SEAM_MIN_KEY_CHARS = 24
+# Trailing sentences of a segment that may be missing from the next one (a sentence cut by the window end)
+SEAM_SLACK_SENTENCES = 1
+
+
+def _sentence_key(sentence: str) -> str:
+    return re.sub(r"[\W_]+", " ", sentence[:SENTENCE_KEY_CHARS * 2]).strip().lower()[:SENTENCE_KEY_CHARS]
+
+
+def _similar(first: str, second: str, threshold: float) -> bool:
+    matcher = SequenceMatcher(None, first, second)
+    # The cheap upper bounds rule out most pairs before the full comparison
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+class SegmentStitcher:
+    """
+    Joins formatted overlapping segments one at a time, removing the text repeated at each seam.
+
+    The overlap is the longest run of leading sentences of the new segment that repeats, sentence by
+    sentence, the trailing sentences of the previous one (allowing SEAM_SLACK_SENTENCES unrepeated
+    sentences at its very end). The first sentence may be a fragment of the repeated one, since a
+    window can start mid-sentence. Runs shorter than SEAM_MIN_KEY_CHARS are ignored, so without a
+    real overlap nothing is dropped.
+
+    Args:
+        similarity (float): Minimum similarity ratio for two sentences to count as duplicates.
+        search_sentences (int): Number of sentences examined on each side of a seam.
+    """
+
+    _sentence_pattern = re.compile(r"[^.!?\n]+[.!?]*")
+
+    def __init__(self, similarity: float = 0.8, search_sentences: int = 12):
+        self.similarity = similarity
+        self.search_sentences = search_sentences
+        self._tail = None  # keys of the trailing sentences of the last segment
+
+    def add(self, segment: str) -> str:
+        """
+        Adds the next segment.
+
+        Returns:
+            str: The text to append to the output, including the separator; empty if nothing is new.
+        """
+        segment = segment.strip()
+        if not segment:
+            return ""
+        separator = ""
+        if self._tail is not None:
+            leading = []
+            for match in self._sentence_pattern.finditer(segment):
+                if len(leading) >= self.search_sentences:
+                    break
+                key = _sentence_key(match.group())
+                if key:
+                    leading.append((key, match.end()))
+            segment = segment[self._seam_cut(leading):].lstrip()
+            if not segment:
+                return ""
+            separator = "\n\n"
+        sentences = self._sentence_pattern.findall(segment)[-self.search_sentences:]
+        self._tail = [key for key in map(_sentence_key, sentences) if key]
+        return separator + segment
+
+    def _seam_cut(self, leading: List[Tuple[str, int]]) -> int:
+        # Offset in the new segment where the repeated run of sentences ends; 0 without a run
+        cut = 0
+        for slack in range(min(SEAM_SLACK_SENTENCES, len(self._tail)) + 1):
+            tail = self._tail[:len(self._tail) - slack]
+            for size in range(min(len(leading), len(tail)), 0, -1):
+                run = leading[:size]
+                if (sum(len(key) for key, _ in run) >= SEAM_MIN_KEY_CHARS
+                        and all(self._repeats(key, previous, i == 0) for i, ((key, _), previous) in enumerate(zip(run, tail[-size:])))):
+                    cut = max(cut, run[-1][1])
+                    break
+        return cut
+
+    def _repeats(self, key: str, previous: str, first: bool) -> bool:
+        return _similar(key, previous, self.similarity) or (first and previous.endswith(key))
+
+
+def _clean_caption_line(line: str) -> str:
+    line = NON_SPEECH_PATTERN.sub(" ", line)
+    line = LEADING_TIMESTAMP_PATTERN.sub(" ", line)
+    line = FILLER_PATTERN.sub(" ", line)
+    return " ".join(line.split())
+
+
+def _overlap_length(previous_words: List[str], words: List[str]) -> int:
+    # Longest run of trailing previous words that the new line starts with
+    keys = [word.lower() for word in words]
+    for size in range(min(len(previous_words), len(keys)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous_words[-size:] == keys[:size]:
+            return size
+    return 0
+
+
+def compact_transcript(text: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Removes the noise of auto-generated captions before the text is sent to the LLM.
+
+    Rolling duplicate caption lines are collapsed, non-speech tags, SRT/VTT cue lines, leading
+    timestamps and hesitation fillers are stripped and whitespace is normalized. Caption line
+    boundaries are kept.
+
+    Args:
+        text (str): The subtitles text.
+
+    Returns:
+        Tuple[str, Dict[str, int]]: The compacted text and its statistics: "tokens_before",
+            "tokens_after", "lines_before" and "lines_after".
+    """
+    lines = text.splitlines()
+    compacted = []
+    recent_words = []
+    for i, line in enumerate(lines):
+        if CUE_TIMING_PATTERN.match(line) or (CUE_NUMBER_PATTERN.match(line) and i + 1 < len(lines)
+                                              and CUE_TIMING_PATTERN.match(lines[i + 1])):
+            continue
+        line = _clean_caption_line(line)
+        if not line:
+            continue
+        words = line.split()
+        overlap = _overlap_length(recent_words, words)
+        words = words[overlap:]
+        if not words:
+            continue
+        compacted.append(" ".join(words))
+        recent_words = (recent_words + [word.lower() for word in words])[-MAX_OVERLAP_WORDS:]
+
+    compacted_text = "\n".join(compacted)
+    stats = {
+        "tokens_before": estimate_tokens(text),
+        "tokens_after": estimate_tokens(compacted_text),
+        "lines_before": len(lines),
+        "lines_after": len(compacted),
+    }
+    return compacted_text, stats
@@ -0,0 +1,122 @@
+import re
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+from src.cache import TTLCache
+
+# Characters of transcript rendered per page
+PAGE_CHARS = 6000
+SNIPPET_CHARS = 160
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Indexes shared by every session, keyed by the transcript's store key
+_indexes = TTLCache(maxsize=64, ttl=60 * 60)
+
+
+class TranscriptIndex:
+    """
+    Pages and word index of a formatted transcript, built once so each rerun renders only one page.
+
+    Paragraphs are packed into pages of about `page_chars` characters; paragraphs longer than a page
+    are split on sentence ends. The word index maps every lowercase word to the paragraphs containing it.
+
+    Args:
+        text (str): The transcript.
+        page_chars (int): Target size of a page in characters.
+    """
+
+    __slots__ = ("paragraphs", "page_starts", "_postings")
+
+    def __init__(self, text: str, page_chars: int = PAGE_CHARS):
+        self.paragraphs = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if paragraph:
+                self.paragraphs.extend(_split_long(paragraph, page_chars))
+
+        self.page_starts = [0]
+        size = 0
+        for i, paragraph in enumerate(self.paragraphs):
+            if size and size + len(paragraph) > page_chars:
+                self.page_starts.append(i)
+                size = 0
+            size += len(paragraph)
+
+        self._postings: Dict[str, List[int]] = {}
+        for i, paragraph in enumerate(self.paragraphs):
+            for word in set(_WORD.findall(paragraph.lower())):
+                self._postings.setdefault(word, []).append(i)
+
+    @property
+    def pages(self) -> int:
+        return len(self.page_starts)
+
+    def page(self, number: int) -> str:
+        """Return the text of page `number`, counted from 0."""
+        start = self.page_starts[number]
+        end = self.page_starts[number + 1] if number + 1 < len(self.page_starts) else len(self.paragraphs)
+        return "\n\n".join(self.paragraphs[start:end])
+
+    def page_of(self, paragraph: int) -> int:
+        """Return the page number (from 0) holding the given paragraph."""
+        return bisect_right(self.page_starts, paragraph) - 1
+
+    def search(self, query: str, limit: int = 50) -> List[Tuple[int, str]]:
+        """
+        Find the paragraphs containing every word of `query`.
+
+        Args:
+            query (str): The search words; case is ignored.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[int, str]]: The matching paragraph numbers with a snippet around the first match, in transcript order.
+        """
+        terms = list(dict.fromkeys(_WORD.findall(query.lower())))
+        if not terms:
+            return []
+        postings = sorted((self._postings.get(term, []) for term in terms), key=len)
+        matches = set(postings[0])
+        for other in postings[1:]:
+            matches.intersection_update(other)
+        return [(i, _snippet(self.paragraphs[i], terms[0])) for i in sorted(matches)[:limit]]
+
+
+def _split_long(paragraph: str, page_chars: int) -> List[str]:
+    if len(paragraph) <= page_chars:
+        return [paragraph]
+    parts = []
+    current = ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        if current and len(current) + len(sentence) > page_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _snippet(paragraph: str, term: str) -> str:
+    match = re.search(rf"\b{re.escape(term)}\b", paragraph, re.IGNORECASE)
+    position = match.start() if match else 0
+    start = max(0, position - SNIPPET_CHARS // 2)
+    snippet = paragraph[start:start + SNIPPET_CHARS].replace("\n", " ")
+    return ("…" if start else "") + snippet + ("…" if start + SNIPPET_CHARS < len(paragraph) else "")
+
+
+def highlight(text: str, query: str) -> str:
+    """Wrap the words of `query` found in `text` in <mark> tags."""
+    terms = sorted(set(_WORD.findall(query.lower())), key=len, reverse=True)
+    if not terms:
+        return text
+    pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE)
+    return pattern.sub(r"<mark>\1</mark>", text)
+
+
+def get_transcript_index(key: str, text: str) -> TranscriptIndex:
+    """Return the index of a transcript, building it once per process for its store key."""
+    return _indexes.get_or_load(key, lambda: TranscriptIndex(text))
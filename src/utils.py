@@ -1,9 +1,42 @@
-import base64
+import re
+from functools import lru_cache
 
+# Served by Streamlit from ./static (server.enableStaticServing), so the browser downloads
+# and caches it once instead of receiving it as a data URI on every rerun
+BACKGROUND_URL = "app/static/background.jpg"
 
-def get_base64(image_path):
-    with open(image_path, "rb") as file:
-        return base64.b64encode(file.read()).decode()
+
+def extract_video_id(url):
+    """
+    Extracts the 11-character video ID from a YouTube URL.
+
+    Parameters:
+        url (str): The original URL of the YouTube video.
+
+    Returns:
+        str: The video ID.
+    """
+    match = re.search(r"(?:v=|youtu\.be/|embed/)([a-zA-Z0-9_-]{11})", url)
+    if not match:
+        raise ValueError("Invalid YouTube URL")
+
+    return match.group(1)
+
+def format_timestamp(seconds):
+    """
+    Formats a number of seconds as M:SS, or H:MM:SS for an hour or more.
+
+    Parameters:
+        seconds (float): The time in seconds.
+
+    Returns:
+        str: The formatted timestamp.
+    """
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
 
 def convert_youtube_url(url):
     """
@@ -23,21 +56,15 @@ def convert_youtube_url(url):
     Returns:
         str: The embeddable URL for the YouTube video.
     """
-    import re
-
-    # Extract video ID using regex
-    match = re.search(r"(?:v=|youtu\.be/|embed/)([a-zA-Z0-9_-]{11})", url)
-    if not match:
-        raise ValueError("Invalid YouTube URL")
-
-    video_id = match.group(1)
+    video_id = extract_video_id(url)
 
     # Construct the embeddable URL
     embed_url = f"https://www.youtube.com/embed/{video_id}"
 
     return embed_url
 
-def style_css(background_image):
+@lru_cache(maxsize=None)
+def style_css(background_url=BACKGROUND_URL):
     return f"""
     <style>
         /* General styles */
@@ -47,7 +74,7 @@ def style_css(background_image):
         header[data-testid="stHeader"] {{ background-color: rgba(0, 0, 0, 0.3); color: white; padding: 20px; }}
         /* Main content styling */
         .stApp {{
-            background-image: url("data:image/jpg;base64,{background_image}");
+            background-image: url("{background_url}");
             background-size: cover;
         }}
         /* Area styling */
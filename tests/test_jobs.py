@@ -0,0 +1,56 @@
+import pytest
+
+from src.jobs import DONE, FAILED, MAX_JOB_ATTEMPTS, QUEUED, REGENERATE, RUNNING, JobQueue
+
+PARAMS = {"url": "https://www.youtube.com/watch?v=abcdefghijk", "caption_language": "English"}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_identical_jobs_are_deduplicated(queue):
+    job_id = queue.submit(PARAMS, "key")
+    assert queue.submit(dict(PARAMS, url="https://youtu.be/abcdefghijk"), "other key") == job_id
+    assert queue.submit(dict(PARAMS, chosen_language="German"), "key") != job_id
+
+
+def test_regenerations_are_never_deduplicated(queue):
+    params = dict(PARAMS, action=REGENERATE)
+    assert queue.submit(dict(params, request="1"), "key") != queue.submit(dict(params, request="2"), "key")
+
+
+def test_stale_job_is_requeued_until_attempts_run_out(queue):
+    job_id = queue.submit(PARAMS, "key")
+    for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+        assert queue.claim("worker")["id"] == job_id
+        assert queue.get(job_id)["status"] == RUNNING and queue.get(job_id)["attempts"] == attempt
+        # The worker stops reporting
+        assert queue.requeue_stale(-1) == 1
+        expected = QUEUED if attempt < MAX_JOB_ATTEMPTS else FAILED
+        assert queue.get(job_id)["status"] == expected
+    assert queue.claim("worker") is None
+    assert "stopped responding" in queue.get(job_id)["error"]
+
+
+def test_transient_failures_are_retried_up_to_the_cap(queue):
+    job_id = queue.submit(PARAMS, "key")
+    for _ in range(MAX_JOB_ATTEMPTS):
+        queue.claim("worker")
+        queue.fail(job_id, "timed out", retry=True)
+    assert queue.get(job_id)["status"] == FAILED
+    assert queue.get(job_id)["attempts"] == MAX_JOB_ATTEMPTS
+
+
+def test_output_is_streamed_and_cleared_on_completion(queue):
+    job_id = queue.submit(PARAMS, "key")
+    queue.claim("worker")
+    queue.append_output(job_id, "worker", {"summary": "Sum", "full_transcript": ""})
+    position, pieces = queue.read_output(job_id)
+    queue.append_output(job_id, "worker", {"summary": "mary"})
+    assert pieces == [("summary", "Sum")]
+    assert queue.read_output(job_id, position)[1] == [("summary", "mary")]
+    queue.complete(job_id, {"summary_key": "s"})
+    assert queue.get(job_id)["status"] == DONE
+    assert queue.read_output(job_id)[1] == []
@@ -0,0 +1,74 @@
+import random
+
+from src.text_processing import SegmentStitcher, compact_transcript, estimate_tokens, split_captions, split_windows
+
+
+def stitch(segments):
+    stitcher = SegmentStitcher()
+    return "".join(stitcher.add(segment) for segment in segments)
+
+
+def test_stitcher_removes_repeated_overlap():
+    first = ("Alpha sentence about models is here. We measure the throughput of the system carefully. "
+             "Then we look at the cache hit rate.")
+    second = ("the throughput of the system carefully. Then we look at the cache hit rate. "
+              "New content about memory starts here.")
+    assert stitch([first, second]) == first + "\n\nNew content about memory starts here."
+
+
+def test_stitcher_allows_a_cut_sentence_at_the_seam():
+    first = "Alpha sentence about models is here. We measure the throughput of the system carefully. And so we"
+    second = "We measure the throughput of the system carefully. And so we think caching matters. New content."
+    stitched = stitch([first, second])
+    assert stitched.count("We measure the throughput") == 1
+    assert stitched.endswith("think caching matters. New content.")
+
+
+def test_stitcher_keeps_short_sentences_that_recur():
+    first = "We start with caching. Okay. The next topic is latency in large systems. Right."
+    second = "Okay. Five real sentences follow here now. Memory matters a lot in practice."
+    assert stitch([first, second]) == first + "\n\n" + second
+
+
+def test_split_windows_overlap_is_stitched_back():
+    words = ["cache", "latency", "model", "window", "budget", "worker", "queue", "token", "stream", "index",
+             "memory", "request", "caption", "summary", "language", "thread"]
+    rng = random.Random(0)
+    lines = [" ".join(rng.choice(words) for _ in range(rng.randint(6, 12))).capitalize() + "." for _ in range(200)]
+    text = "\n".join(lines)
+    windows = split_windows(text, max_tokens=300, overlap_tokens=60)
+    assert len(windows) > 1
+    chunks = split_captions(text, 300)
+    for previous, chunk, window in zip(chunks, chunks[1:], windows[1:]):
+        # Every window after the first starts with the end of the previous chunk
+        overlap = window[:-len(chunk) - 1]
+        assert window.endswith("\n" + chunk) and overlap and previous.endswith(overlap)
+    stitched = stitch(windows)
+    for line in lines:
+        assert stitched.count(line) == 1
+
+
+def test_split_captions_keeps_oversize_lines_within_budget():
+    text = "word " * 3000 + "\n" + "字" * 9000
+    chunks = split_captions(text, 1000)
+    assert max(estimate_tokens(chunk) for chunk in chunks) <= 1000
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == text.replace(" ", "").replace("\n", "")
+
+
+def test_compact_transcript_keeps_units_times_and_references():
+    text = "at 10:30 we read John 3:16\nuse a 5 mm bolt\n100\npeople came, um, to see it"
+    compacted, stats = compact_transcript(text)
+    assert compacted.splitlines() == ["at 10:30 we read John 3:16", "use a 5 mm bolt", "100", "people came, to see it"]
+    assert stats["lines_before"] == 4 and stats["lines_after"] == 4
+
+
+def test_compact_transcript_drops_cue_lines_and_leading_timestamps():
+    text = "1\n00:00:01,000 --> 00:00:03,000\nhello there\n\n2\n00:00:03,000 --> 00:00:05,000\n[00:00:04] general kenobi"
+    compacted, _ = compact_transcript(text)
+    assert compacted == "hello there\ngeneral kenobi"
+
+
+def test_compact_transcript_collapses_rolling_captions():
+    compacted, stats = compact_transcript("so today we talk\nwe talk about caching\nabout caching and latency")
+    assert compacted == "so today we talk\nabout caching\nand latency"
+    assert stats["tokens_after"] < stats["tokens_before"]
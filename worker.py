@@ -0,0 +1,47 @@
+"""
+Job workers: process the videos queued by the Streamlit app, separately from the web server.
+
+Usage:
+    JOB_WORKERS=0 streamlit run app.py
+    python worker.py --processes 4
+    python worker.py --stats
+
+Start more workers, on this machine or any machine sharing the queue file, to process more videos at once.
+"""
+import argparse
+import os
+import sys
+import time
+
+from src.jobs import JOBS_PATH, JobQueue, start_workers
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run worker processes for the video job queue.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--queue", default=JOBS_PATH, help=f"Path of the job queue (default: {JOBS_PATH})")
+    parser.add_argument("--budget-shares", type=int,
+                        help="Number of processes sharing GEMINI_RPM and GEMINI_TPM, across all machines (default: --processes)")
+    parser.add_argument("--stats", action="store_true", help="Print the number of jobs in each status and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.stats:
+        for status, count in JobQueue(args.queue).stats().items():
+            print(f"{status}: {count}")
+        return 0
+
+    workers = start_workers(args.processes, args.queue, args.budget_shares)
+    print(f"Started {len(workers)} workers on {args.queue}", file=sys.stderr)
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping workers; their running jobs are picked up again later", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())